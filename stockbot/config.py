@@ -7,6 +7,9 @@ TWELVEDATA_API_KEY = os.getenv("TWELVEDATA_API_KEY")
 TAP_SECRET_KEY = os.getenv("TAP_SECRET_KEY")
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+# Root log level set by main(); the scheduled cache/pool/credit reports log at INFO
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
 PG_DB = os.getenv("PG_DB")
 PG_USER = os.getenv("PG_USER")
 PG_PASS = os.getenv("PG_PASS")
@@ -16,4 +19,100 @@ PG_PORT = os.getenv("PG_PORT")
 # Rate limit configuration
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_MAX_CALLS = 5  # max calls per window
+RATE_LIMIT_PREMIUM_MAX_CALLS = int(os.getenv("RATE_LIMIT_PREMIUM_MAX_CALLS", "10"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # buckets kept in memory
+# "memory" keeps buckets per process; "postgres" shares them (and the TwelveData
+# credit budget) between every bot and ETL process through rate_limit_buckets
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+TWELVEDATA_CREDITS_PER_MINUTE = int(os.getenv("TWELVEDATA_CREDITS_PER_MINUTE", "600"))
+# Longest a user-facing TwelveData call queues for credits before it's rejected
+TD_CREDIT_MAX_WAIT = float(os.getenv("TD_CREDIT_MAX_WAIT", "5"))
+
+# How often the ticker universe (search index, symbol registry, COMPANIES) is reloaded
+TICKER_RELOAD_MINUTES = int(os.getenv("TICKER_RELOAD_MINUTES", "15"))
+
+# Fuzzy ticker search: universes from PREFILTER_MIN_CHOICES names up score the
+# CANDIDATES n-gram matches first, then only names whose WRatio bound can still
+# reach the top-k (see services/ngram_index.py); plus parity/latency checks
+TICKER_SEARCH_PREFILTER_MIN_CHOICES = int(os.getenv("TICKER_SEARCH_PREFILTER_MIN_CHOICES", "2000"))
+TICKER_SEARCH_CANDIDATES = int(os.getenv("TICKER_SEARCH_CANDIDATES", "300"))
+TICKER_SEARCH_PARITY = os.getenv("TICKER_SEARCH_PARITY", "0") == "1"
+TICKER_SEARCH_LATENCY_TARGET_MS = float(os.getenv("TICKER_SEARCH_LATENCY_TARGET_MS", "25"))
+TICKER_SEARCH_CACHE_SIZE = int(os.getenv("TICKER_SEARCH_CACHE_SIZE", "2048"))
+
+# Startup: LAZY_STARTUP=1 starts polling first and loads reference data in the
+# background; heavy libraries (pandas, plotly, yfinance, ...) load on first use.
+LAZY_STARTUP = os.getenv("LAZY_STARTUP", "1") == "1"
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+# How long a search waits for the background ticker load before giving up
+TICKER_LOAD_WAIT_SECONDS = float(os.getenv("TICKER_LOAD_WAIT_SECONDS", "10"))
+
+# Subscriber state cache used by with_subscription_check
+SUBSCRIBER_CACHE_TTL = int(os.getenv("SUBSCRIBER_CACHE_TTL", "300"))  # seconds
+SUBSCRIBER_CACHE_SIZE = int(os.getenv("SUBSCRIBER_CACHE_SIZE", "50000"))
+
+# PostgreSQL connection pool: getconn blocks up to PG_POOL_TIMEOUT seconds when
+# all connections are leased; leases longer than PG_POOL_LEAK_SECONDS are reported
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "8"))
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "10"))
+PG_POOL_LEAK_SECONDS = float(os.getenv("PG_POOL_LEAK_SECONDS", "30"))
+PG_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "5000"))
+
+# "batch" pool partition used by ETLs and scheduled jobs, sized and timed out
+# separately so bulk work can't starve the interactive handlers above
+PG_BATCH_POOL_MAX = int(os.getenv("PG_BATCH_POOL_MAX", "4"))
+PG_BATCH_POOL_TIMEOUT = float(os.getenv("PG_BATCH_POOL_TIMEOUT", "120"))
+PG_BATCH_LEAK_SECONDS = float(os.getenv("PG_BATCH_LEAK_SECONDS", "600"))
+PG_BATCH_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_BATCH_STATEMENT_TIMEOUT_MS", "600000"))
+
+# Run the hot queries in database/queries.PREPARED_STATEMENTS as server-side
+# prepared statements. Turn off behind a transaction-pooling PgBouncer.
+PG_PREPARED_STATEMENTS = os.getenv("PG_PREPARED_STATEMENTS", "1") == "1"
+
+# asyncpg access layer (database/aio.py). ASYNC_DB_ENABLED lets handlers that
+# need several independent queries (e.g. shariah_check) run them concurrently.
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "0") == "1"
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "10"))
+ASYNC_DB_TIMEOUT = float(os.getenv("ASYNC_DB_TIMEOUT", "10"))  # seconds a handler waits
+
+# Disk tier under the TwelveData response caches (services/api/cache.py);
+# set TD_DISK_CACHE_PATH="" to keep them in memory only
+TD_DISK_CACHE_PATH = os.getenv("TD_DISK_CACHE_PATH", "cache/twelvedata.sqlite3")
+TD_DISK_CACHE_MAX_ENTRIES = int(os.getenv("TD_DISK_CACHE_MAX_ENTRIES", "20000"))  # per cache
+# How long a caller waits on another thread's in-flight TwelveData request for the same key
+TD_SINGLEFLIGHT_TIMEOUT = float(os.getenv("TD_SINGLEFLIGHT_TIMEOUT", "15"))
+
+# Market-hours-aware TTLs for TwelveData quotes and time series
+# (services/market_hours.py): short while the exchange is open, until the
+# next open while it's closed
+TD_QUOTE_OPEN_TTL = int(os.getenv("TD_QUOTE_OPEN_TTL", "60"))  # seconds
+TD_TIME_SERIES_OPEN_TTL = int(os.getenv("TD_TIME_SERIES_OPEN_TTL", "300"))
+TD_CLOSED_TTL_MAX = int(os.getenv("TD_CLOSED_TTL_MAX", str(3 * 24 * 3600)))
+TD_HOLIDAY_TTL = int(os.getenv("TD_HOLIDAY_TTL", "1800"))  # closed during session hours
+# Stale-while-revalidate: an expired quote/profile younger than this is served
+# at once while one background refresh replaces it; older ones are refetched
+# before answering. 0 turns it off.
+TD_QUOTE_STALE_MAX = int(os.getenv("TD_QUOTE_STALE_MAX", "900"))  # seconds since fetched
+TD_PROFILE_STALE_MAX = int(os.getenv("TD_PROFILE_STALE_MAX", str(24 * 3600)))
+# TTLs for the fundamentals endpoints behind the DB fallbacks; they change
+# at most daily (statistics carries market cap, so it's shorter)
+TD_PROFILE_TTL = int(os.getenv("TD_PROFILE_TTL", str(24 * 3600)))
+TD_STATISTICS_TTL = int(os.getenv("TD_STATISTICS_TTL", "3600"))
+TD_DIVIDENDS_TTL = int(os.getenv("TD_DIVIDENDS_TTL", str(24 * 3600)))
+TD_STATEMENT_TTL = int(os.getenv("TD_STATEMENT_TTL", str(24 * 3600)))  # income / balance sheet
+# Incremental bar store for the history charts (services/api/bar_store.py):
+# most bars kept per (symbol, interval), and how long an untouched series is kept.
+# The window never goes below the largest history chart (30 days of 1h bars).
+TD_BAR_WINDOW = max(30 * 7, int(os.getenv("TD_BAR_WINDOW", "500")))
+TD_BAR_RETENTION = int(os.getenv("TD_BAR_RETENTION", str(7 * 24 * 3600)))
 
+# History charts (services/charts.py): backend ("matplotlib" or "plotly"),
+# warm worker processes (0 renders in the calling thread), and per-chart timeout
+CHART_BACKEND = os.getenv("CHART_BACKEND", "matplotlib")
+CHART_PROCESSES = int(os.getenv("CHART_PROCESSES", "2"))
+CHART_RENDER_TIMEOUT = float(os.getenv("CHART_RENDER_TIMEOUT", "10"))
+# Batched /quote calls (services/api/batch_quotes.py): how long to collect
+# requests before sending, and the most symbols in one call
+TD_BATCH_WINDOW_MS = int(os.getenv("TD_BATCH_WINDOW_MS", "50"))
+TD_BATCH_MAX_SYMBOLS = int(os.getenv("TD_BATCH_MAX_SYMBOLS", "120"))
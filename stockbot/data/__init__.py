@@ -1,5 +1,6 @@
 # stockbot/data/__init__.py
 from stockbot.database.connection import get_db_conn, put_db_conn
+from stockbot.services import symbol_registry
 from psycopg2.extras import RealDictCursor
 
 def _load_companies_from_db():
@@ -17,5 +18,22 @@ def _load_companies_from_db():
     # adjust the key if your column is named differently (e.g. 'ticker')
     return [r['symbol'] for r in rows]
 
-# at import time we fetch the live list from your DB
-COMPANIES = _load_companies_from_db()
\ No newline at end of file
+# Only used until the ticker universe has been loaded; filled on first use
+# rather than at import, so importing an ETL module doesn't cost a DB round trip.
+_COMPANIES = None
+
+def get_companies():
+    """Current symbol list. ETLs should call this once per run rather than hold COMPANIES."""
+    global _COMPANIES
+    universe = symbol_registry.current()
+    if universe is not None:
+        return list(universe.companies)
+    if _COMPANIES is None:
+        _COMPANIES = _load_companies_from_db()
+    return _COMPANIES
+
+def __getattr__(name):
+    # keeps `stockbot.data.COMPANIES` working, now loaded lazily
+    if name == "COMPANIES":
+        return get_companies()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
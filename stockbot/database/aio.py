@@ -0,0 +1,153 @@
+# stockbot/database/aio.py
+"""
+asyncio access to the same queries as database/queries.py, on asyncpg.
+
+The bot itself is synchronous (python-telegram-bot 13), so the coroutines run
+on one event loop in a background thread; handlers call run_coro() /
+run_all() to wait for one or several of them without holding a pooled
+psycopg2 connection (or a thread) per query. asyncpg is imported on first use.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from typing import Optional
+from stockbot.config import PG_DB, PG_USER, PG_PASS, PG_HOST, PG_PORT
+from stockbot.config import PG_STATEMENT_TIMEOUT_MS, PG_PREPARED_STATEMENTS
+from stockbot.config import ASYNC_DB_POOL_MAX, ASYNC_DB_TIMEOUT
+from stockbot.database.prepared import numbered_params
+from stockbot.database.queries import (
+    SUBSCRIBER_SELECT_STATE,
+    STOCK_DATA_LATEST,
+    DIVIDENDS_SELECT,
+    DIVIDENDS_SELECT_YEAR,
+    INCOME_SELECT_YEARS,
+    INCOME_SELECT_YEAR,
+    INCOME_SELECT_LATEST,
+    BALANCE_SELECT_YEARS,
+    BALANCE_SELECT_LATEST,
+    TICKERS_SELECT,
+)
+
+_LOOP = None
+_POOL = None
+_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _sql(query: str) -> str:
+    return numbered_params(query)[0]
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    if _LOOP is None:
+        with _LOCK:
+            if _LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="aio-db", daemon=True).start()
+                _LOOP = loop
+    return _LOOP
+
+
+async def _create_pool():
+    import asyncpg
+    return await asyncpg.create_pool(
+        database=PG_DB,
+        user=PG_USER,
+        password=PG_PASS,
+        host=PG_HOST,
+        port=int(PG_PORT) if PG_PORT else None,
+        min_size=1,
+        max_size=ASYNC_DB_POOL_MAX,
+        # asyncpg prepares and caches every statement it runs; turn that
+        # off together with the psycopg2 prepared statements
+        statement_cache_size=100 if PG_PREPARED_STATEMENTS else 0,
+        server_settings={"statement_timeout": str(PG_STATEMENT_TIMEOUT_MS)},
+    )
+
+
+async def _get_pool():
+    # only ever runs on _LOOP; concurrent first callers await the same task
+    global _POOL
+    if _POOL is None:
+        _POOL = asyncio.ensure_future(_create_pool())
+    try:
+        return await asyncio.shield(_POOL)
+    except Exception:
+        _POOL = None  # let the next call retry
+        raise
+
+
+def run_coro(coro, timeout: float = ASYNC_DB_TIMEOUT):
+    """Run a coroutine on the background loop and wait for its result."""
+    fut = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return fut.result(timeout)
+    except concurrent.futures.TimeoutError:
+        # don't leave the query running on the loop after the caller gave up
+        fut.cancel()
+        raise
+
+
+async def _gather(*coros):
+    return await asyncio.gather(*coros)
+
+
+def run_all(*coros, timeout: float = ASYNC_DB_TIMEOUT) -> list:
+    """Run several coroutines concurrently; results in argument order."""
+    return run_coro(_gather(*coros), timeout)
+
+
+async def fetch_one(query: str, *args) -> Optional[dict]:
+    pool = await _get_pool()
+    row = await pool.fetchrow(_sql(query), *args)
+    return dict(row) if row is not None else None
+
+
+async def fetch_all(query: str, *args) -> list:
+    pool = await _get_pool()
+    return [dict(row) for row in await pool.fetch(_sql(query), *args)]
+
+
+# ─── Subscribers ────────────────────────────────────────────────────────────
+
+async def fetch_subscriber_state(chat_id: int) -> Optional[dict]:
+    return await fetch_one(SUBSCRIBER_SELECT_STATE, chat_id)
+
+
+# ─── Company data ───────────────────────────────────────────────────────────
+
+async def fetch_stock_data(symbol: str) -> Optional[dict]:
+    return await fetch_one(STOCK_DATA_LATEST, symbol)
+
+
+async def fetch_dividends(symbol: str, year: Optional[int] = None) -> list:
+    if year is None:
+        return await fetch_all(DIVIDENDS_SELECT, symbol)
+    return await fetch_all(DIVIDENDS_SELECT_YEAR, symbol, year)
+
+
+async def fetch_income_years(symbol: str) -> list:
+    return [int(r["yr"]) for r in await fetch_all(INCOME_SELECT_YEARS, symbol)]
+
+
+async def fetch_income_statement(symbol: str, year: Optional[int] = None) -> Optional[dict]:
+    """The annual statement for `year`, or the latest one."""
+    if year is None:
+        return await fetch_one(INCOME_SELECT_LATEST, symbol)
+    return await fetch_one(INCOME_SELECT_YEAR, symbol, year)
+
+
+async def fetch_balance_years(symbol: str) -> list:
+    return [int(r["yr"]) for r in await fetch_all(BALANCE_SELECT_YEARS, symbol)]
+
+
+async def fetch_latest_balance_sheet(symbol: str) -> Optional[dict]:
+    return await fetch_one(BALANCE_SELECT_LATEST, symbol)
+
+
+async def fetch_tickers() -> list:
+    """(symbol, arabic_name, english_name) rows, like ticker_service's loader."""
+    pool = await _get_pool()
+    return [tuple(row) for row in await pool.fetch(_sql(TICKERS_SELECT))]
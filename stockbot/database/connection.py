@@ -1,9 +1,17 @@
-from psycopg2.pool import SimpleConnectionPool
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from stockbot.config import PG_DB, PG_USER, PG_PASS, PG_HOST, PG_PORT
+from stockbot.config import PG_POOL_MIN, PG_POOL_MAX, PG_POOL_TIMEOUT, PG_POOL_LEAK_SECONDS
+from stockbot.config import PG_STATEMENT_TIMEOUT_MS
+from stockbot.config import PG_BATCH_POOL_MAX, PG_BATCH_POOL_TIMEOUT, PG_BATCH_LEAK_SECONDS
+from stockbot.config import PG_BATCH_STATEMENT_TIMEOUT_MS
+from stockbot.database.prepared import PreparingConnection
 
-PG_POOL = SimpleConnectionPool(
-    minconn=1,
-    maxconn=8,
+_CONN_KWARGS = dict(
+    connection_factory=PreparingConnection,
     dbname=PG_DB,
     user=PG_USER,
     password=PG_PASS,
@@ -11,11 +19,163 @@ PG_POOL = SimpleConnectionPool(
     port=PG_PORT
 )
 
-def get_db_conn():
+
+class PoolTimeout(PoolError):
+    """No connection became free within the acquire timeout."""
+
+
+class BlockingConnectionPool:
+    """
+    ThreadedConnectionPool that waits (up to `timeout` seconds) for a free
+    connection instead of raising as soon as maxconn is reached, and keeps
+    track of who holds what for pool_stats().
+    """
+
+    def __init__(self, minconn, maxconn, timeout, leak_seconds, **kwargs):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.leak_seconds = leak_seconds
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        # id(conn) -> (leased_at, thread name)
+        self._leases = {}
+        self._stats = {
+            "acquired": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "lease_ms_total": 0.0,
+            "lease_ms_max": 0.0,
+            "leaks": 0,
+        }
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+                holders = sorted(name for _, name in self._leases.values())
+            logging.error(f"🚰 DB pool exhausted after {timeout}s; held by {holders}")
+            raise PoolTimeout(f"no DB connection free within {timeout}s")
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        waited = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._leases[id(conn)] = (time.monotonic(), threading.current_thread().name)
+            self._stats["acquired"] += 1
+            self._stats["wait_ms_total"] += waited
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited)
+        return conn
+
+    def putconn(self, conn):
+        with self._lock:
+            lease = self._leases.pop(id(conn), None)
+            if lease is not None:
+                held = time.monotonic() - lease[0]
+                self._stats["lease_ms_total"] += held * 1000
+                self._stats["lease_ms_max"] = max(self._stats["lease_ms_max"], held * 1000)
+                if held > self.leak_seconds:
+                    self._stats["leaks"] += 1
+        if lease is not None and held > self.leak_seconds:
+            logging.warning(f"🚰 DB connection held {held:.1f}s by {lease[1]}")
+        try:
+            self._pool.putconn(conn)
+        finally:
+            if lease is not None:
+                self._slots.release()
+
+    def owns(self, conn) -> bool:
+        with self._lock:
+            return id(conn) in self._leases
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            in_use = len(self._leases)
+            overdue = [
+                (name, round(now - leased_at, 1))
+                for leased_at, name in self._leases.values()
+                if now - leased_at > self.leak_seconds
+            ]
+        acquired = stats["acquired"]
+        released = acquired - in_use
+        return {
+            "in_use": in_use,
+            "max": self.maxconn,
+            "acquired": acquired,
+            "timeouts": stats["timeouts"],
+            "wait_ms_avg": stats["wait_ms_total"] / acquired if acquired else 0.0,
+            "wait_ms_max": stats["wait_ms_max"],
+            "lease_ms_avg": stats["lease_ms_total"] / released if released else 0.0,
+            "lease_ms_max": stats["lease_ms_max"],
+            "leaks": stats["leaks"],
+            "overdue": overdue,
+        }
+
+
+def _statement_timeout(ms) -> str:
+    return f"-c statement_timeout={int(ms)}"
+
+
+# Named partitions, chosen by the caller: handlers use "interactive" (the
+# default) and ETL/scheduled jobs use "batch", so bulk upserts never hold the
+# connections users are waiting on. Each has its own size and statement_timeout.
+POOLS = {
+    "interactive": BlockingConnectionPool(
+        minconn=PG_POOL_MIN,
+        maxconn=PG_POOL_MAX,
+        timeout=PG_POOL_TIMEOUT,
+        leak_seconds=PG_POOL_LEAK_SECONDS,
+        options=_statement_timeout(PG_STATEMENT_TIMEOUT_MS),
+        **_CONN_KWARGS
+    ),
+    "batch": BlockingConnectionPool(
+        minconn=0,
+        maxconn=PG_BATCH_POOL_MAX,
+        timeout=PG_BATCH_POOL_TIMEOUT,
+        leak_seconds=PG_BATCH_LEAK_SECONDS,
+        options=_statement_timeout(PG_BATCH_STATEMENT_TIMEOUT_MS),
+        **_CONN_KWARGS
+    ),
+}
+PG_POOL = POOLS["interactive"]
+
+def get_db_conn(partition: str = "interactive"):
     """Lease a connection from the pool (remember to put it back)."""
-    conn = PG_POOL.getconn()
+    conn = POOLS[partition].getconn()
     conn.autocommit = True
     return conn
 
 def put_db_conn(conn):
+    for pool in POOLS.values():
+        if pool.owns(conn):
+            pool.putconn(conn)
+            return
+    # not leased through get_db_conn (or already returned)
     PG_POOL.putconn(conn)
+
+@contextmanager
+def db_connection(partition: str = "interactive"):
+    """
+    Lease a connection for the duration of a with-block:
+
+        with db_connection() as conn:
+            ...
+
+    The connection goes back to the pool even if the block raises.
+    """
+    conn = get_db_conn(partition)
+    try:
+        yield conn
+    finally:
+        put_db_conn(conn)
+
+def pool_stats() -> dict:
+    """Per-partition stats: {"interactive": {...}, "batch": {...}}."""
+    return {name: pool.stats() for name, pool in POOLS.items()}
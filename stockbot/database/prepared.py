@@ -0,0 +1,75 @@
+# stockbot/database/prepared.py
+import itertools
+import logging
+import re
+from typing import NamedTuple
+from psycopg2 import errors
+from psycopg2.extensions import connection as _PgConnection
+from stockbot.config import PG_PREPARED_STATEMENTS
+from stockbot.database.queries import PREPARED_STATEMENTS
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+class PreparingConnection(_PgConnection):
+    """psycopg2 connection that remembers which statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class Statement(NamedTuple):
+    name: str
+    prepare_sql: str   # PREPARE name AS ... with $1..$n placeholders
+    execute_sql: str   # EXECUTE name (%s, ...) for psycopg2 to fill in
+
+
+def numbered_params(sql: str):
+    """Rewrite psycopg2's %s placeholders as $1..$n; returns (sql, n)."""
+    counter = itertools.count(1)
+    body = _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql.strip().rstrip(";"))
+    return body, next(counter) - 1
+
+
+def _build(name: str, sql: str) -> Statement:
+    body, nparams = numbered_params(sql)
+    args = f" ({', '.join(['%s'] * nparams)})" if nparams else ""
+    return Statement(name, f"PREPARE {name} AS {body}", f"EXECUTE {name}{args}")
+
+
+# query text -> Statement, so call sites keep passing the constants from queries.py
+_REGISTRY = {sql: _build(name, sql) for name, sql in PREPARED_STATEMENTS.items()}
+
+
+def _prepare(cur, stmt: Statement) -> None:
+    cur.execute(stmt.prepare_sql)
+    cur.connection.prepared.add(stmt.name)
+
+
+def execute_prepared(cur, sql: str, params=()):
+    """
+    cur.execute(sql, params), but registered statements are PREPAREd once per
+    connection and then run by name. Falls back to a plain execute when the
+    switch is off, the query isn't registered, or the connection wasn't made
+    by PreparingConnection.
+    """
+    stmt = _REGISTRY.get(sql)
+    prepared = getattr(cur.connection, "prepared", None)
+    if not PG_PREPARED_STATEMENTS or stmt is None or prepared is None:
+        return cur.execute(sql, params)
+
+    if stmt.name not in prepared:
+        _prepare(cur, stmt)
+    try:
+        return cur.execute(stmt.execute_sql, params)
+    except (errors.FeatureNotSupported, errors.InvalidSqlStatementName) as e:
+        # "cached plan must not change result type" after a table gained a
+        # column, or the statement was dropped server-side: prepare again once
+        if not cur.connection.autocommit:
+            raise
+        logging.warning(f"Re-preparing {stmt.name}: {e}")
+        if isinstance(e, errors.FeatureNotSupported):
+            cur.execute(f"DEALLOCATE {stmt.name}")
+        _prepare(cur, stmt)
+        return cur.execute(stmt.execute_sql, params)
@@ -89,3 +89,210 @@ SET usage_count = 0,
     last_usage_reset = %s
 WHERE subscription_type = 'free'
 """
+
+# One round trip per paid feature click: downgrade an expired premium row,
+# resolve the tier and consume a free credit, all under one row lock.
+# Params: (today, chat_id). Returns (subscription_type, allowed); no row if
+# the chat isn't registered.
+SUBSCRIBER_CHECK_AND_CONSUME = """
+WITH cur AS (
+    SELECT chat_id,
+           usage_count,
+           usage_limit,
+           (subscription_type = 'premium'
+            AND expires_at IS NOT NULL
+            AND expires_at < %s) AS expired,
+           subscription_type
+      FROM subscribers
+     WHERE chat_id = %s
+       FOR UPDATE
+), verdict AS (
+    SELECT chat_id,
+           expired,
+           CASE WHEN expired THEN 'free' ELSE subscription_type END AS tier,
+           COALESCE(usage_count < usage_limit, FALSE) AS has_credit
+      FROM cur
+), consumed AS (
+    UPDATE subscribers s
+       SET subscription_type = v.tier,
+           expires_at        = CASE WHEN v.expired THEN NULL ELSE s.expires_at END,
+           usage_count       = CASE WHEN v.tier = 'free' AND v.has_credit
+                                    THEN s.usage_count + 1
+                                    ELSE s.usage_count END
+      FROM verdict v
+     WHERE s.chat_id = v.chat_id
+       AND (v.expired OR (v.tier = 'free' AND v.has_credit))
+    RETURNING s.chat_id
+)
+SELECT tier, (tier <> 'free' OR has_credit) AS allowed
+  FROM verdict
+"""
+
+SUBSCRIBER_DOWNGRADE_EXPIRED = """
+UPDATE subscribers
+SET subscription_type = 'free',
+    expires_at = NULL
+WHERE subscription_type = 'premium'
+  AND expires_at IS NOT NULL
+  AND expires_at < %s
+RETURNING chat_id, subscription_type, expires_at, usage_limit
+"""
+
+SUBSCRIBER_SELECT_STATE = """
+SELECT subscription_type, expires_at, usage_limit
+FROM subscribers
+WHERE chat_id = %s
+"""
+
+STOCK_DATA_LATEST = """
+SELECT *
+FROM stock_data
+WHERE symbol = %s
+ORDER BY updated_date DESC
+LIMIT 1
+"""
+
+DIVIDENDS_SELECT = """
+SELECT fiscal_year, dividend_date, amount
+FROM dividends
+WHERE symbol = %s
+ORDER BY fiscal_year DESC, dividend_date DESC
+"""
+
+DIVIDENDS_SELECT_YEAR = """
+SELECT dividend_date, amount
+FROM dividends
+WHERE symbol = %s AND fiscal_year = %s
+ORDER BY dividend_date DESC
+"""
+
+DIVIDENDS_SELECT_YEARS = """
+SELECT DISTINCT fiscal_year
+FROM dividends
+WHERE symbol = %s
+ORDER BY fiscal_year DESC
+"""
+
+INCOME_SELECT_YEARS = """
+SELECT DISTINCT EXTRACT(YEAR FROM "Fiscal_Date") AS yr
+FROM income_statements
+WHERE "Ticker" = %s
+  AND "Statement_Type" = 'Annual'
+ORDER BY yr DESC
+LIMIT 5
+"""
+
+INCOME_SELECT_YEAR = """
+SELECT *
+FROM income_statements
+WHERE "Ticker" = %s
+  AND EXTRACT(YEAR FROM "Fiscal_Date") = %s
+  AND "Statement_Type" = 'Annual'
+LIMIT 1
+"""
+
+INCOME_SELECT_REVENUE_YEAR = """
+SELECT "TotalRevenue"
+FROM income_statements
+WHERE "Ticker" = %s
+  AND EXTRACT(YEAR FROM "Fiscal_Date") = %s
+  AND "Statement_Type" = 'Annual'
+LIMIT 1
+"""
+
+INCOME_SELECT_LATEST = """
+SELECT *
+FROM income_statements
+WHERE "Ticker" = %s
+  AND "Statement_Type" = 'Annual'
+ORDER BY "Fiscal_Date" DESC
+LIMIT 1
+"""
+
+BALANCE_SELECT_LATEST = """
+SELECT *
+FROM balance_sheets
+WHERE "Ticker" = %s
+  AND "Statement_Type" = 'Annual'
+ORDER BY "Fiscal_Date" DESC
+LIMIT 1
+"""
+
+BALANCE_SELECT_YEARS = """
+SELECT DISTINCT EXTRACT(YEAR FROM "Fiscal_Date") AS yr
+FROM balance_sheets
+WHERE "Ticker" = %s
+  AND "Statement_Type" = 'Annual'
+ORDER BY yr DESC
+LIMIT 5
+"""
+
+TICKERS_SELECT = """
+SELECT symbol, arabic_name, english_name
+FROM tickers_ar_en
+ORDER BY symbol
+"""
+
+# Hot statements run as server-side prepared statements, by name, on every
+# pooled connection (see database/prepared.py and PG_PREPARED_STATEMENTS).
+PREPARED_STATEMENTS = {
+    "subscriber_select": SUBSCRIBER_SELECT,
+    "subscriber_select_state": SUBSCRIBER_SELECT_STATE,
+    "subscriber_update_profile": SUBSCRIBER_UPDATE_PROFILE,
+    "subscriber_update_free": SUBSCRIBER_UPDATE_FREE,
+    "subscriber_insert": SUBSCRIBER_INSERT,
+    "subscriber_consume_free_credit": SUBSCRIBER_CONSUME_FREE_CREDIT,
+    "subscriber_check_and_consume": SUBSCRIBER_CHECK_AND_CONSUME,
+    "stock_data_latest": STOCK_DATA_LATEST,
+    "dividends_select": DIVIDENDS_SELECT,
+    "dividends_select_year": DIVIDENDS_SELECT_YEAR,
+    "dividends_select_years": DIVIDENDS_SELECT_YEARS,
+    "income_select_years": INCOME_SELECT_YEARS,
+    "income_select_year": INCOME_SELECT_YEAR,
+    "income_select_revenue_year": INCOME_SELECT_REVENUE_YEAR,
+    "income_select_latest": INCOME_SELECT_LATEST,
+    "balance_select_latest": BALANCE_SELECT_LATEST,
+    "balance_select_years": BALANCE_SELECT_YEARS,
+}
+
+# Shared token buckets for services/rate_limiter.PostgresBackend. UNLOGGED:
+# losing them on a crash only means every bucket starts full again.
+RATE_LIMIT_BUCKETS_CREATE = """
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket     TEXT PRIMARY KEY,
+    tokens     DOUBLE PRECISION NOT NULL,
+    allowed    BOOLEAN NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+)
+"""
+
+# Refill by elapsed time, then take `cost` tokens if there are enough, in
+# one atomic upsert (the conflicting row is locked while it is updated).
+# statement_timestamp() is fixed for the statement, so every refill term
+# below agrees; GREATEST() keeps time from running backwards when this
+# statement waited on the row lock behind a later one.
+# Params (named): bucket, capacity, rate (tokens/second), cost.
+# Returns (tokens left, allowed).
+RATE_LIMIT_TAKE = """
+INSERT INTO rate_limit_buckets AS b (bucket, tokens, allowed, updated_at)
+VALUES (
+    %(bucket)s,
+    CASE WHEN %(capacity)s >= %(cost)s THEN %(capacity)s - %(cost)s ELSE %(capacity)s END,
+    %(capacity)s >= %(cost)s,
+    statement_timestamp()
+)
+ON CONFLICT (bucket) DO UPDATE SET
+    tokens = CASE
+        WHEN LEAST(%(capacity)s, b.tokens + GREATEST(0, EXTRACT(EPOCH FROM statement_timestamp() - b.updated_at)) * %(rate)s) >= %(cost)s
+        THEN LEAST(%(capacity)s, b.tokens + GREATEST(0, EXTRACT(EPOCH FROM statement_timestamp() - b.updated_at)) * %(rate)s) - %(cost)s
+        ELSE LEAST(%(capacity)s, b.tokens + GREATEST(0, EXTRACT(EPOCH FROM statement_timestamp() - b.updated_at)) * %(rate)s)
+    END,
+    allowed = LEAST(%(capacity)s, b.tokens + GREATEST(0, EXTRACT(EPOCH FROM statement_timestamp() - b.updated_at)) * %(rate)s) >= %(cost)s,
+    updated_at = GREATEST(b.updated_at, statement_timestamp())
+RETURNING tokens, allowed
+"""
+
+RATE_LIMIT_PURGE_IDLE = """
+DELETE FROM rate_limit_buckets
+WHERE updated_at < clock_timestamp() - make_interval(secs => %s)
+"""
@@ -1,7 +1,10 @@
 from functools import wraps
 from datetime import date
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.database.queries import SUBSCRIBER_SELECT, SUBSCRIBER_UPDATE_FREE
+from stockbot.database.prepared import execute_prepared
+from stockbot.database.queries import SUBSCRIBER_SELECT, SUBSCRIBER_UPDATE_FREE, SUBSCRIBER_SELECT_STATE
+from stockbot.services import subscriber_cache
+from stockbot.services.subscriber_cache import SubscriberState, UNREGISTERED
 from dateutil.relativedelta import relativedelta
 
 
@@ -55,6 +58,7 @@ def handle_activation_code(update, context):
         conn.commit()
     finally:
         put_db_conn(conn)
+    subscriber_cache.invalidate(chat_id)
 
     return -1
 
@@ -66,40 +70,26 @@ def with_subscription_check(fn):
     @wraps(fn)
     def wrapped(update, context, *args, **kwargs):
         cid = update.effective_chat.id
-        downgrade_expired(cid)
+        # read-only: expiries are flipped by the downgrade_expired_subscribers
+        # job; until then the quota statement and SubscriberState.effective_tier
+        # already treat a lapsed premium as free
+        if subscriber_cache.get_state(cid) is None:
+            load_subscriber_state(cid)
         return fn(update, context, *args, **kwargs)
 
     return wrapped
 
-def downgrade_expired(chat_id: int) -> None:
-    """
-    If the user’s expires_at is in the past but they’re still marked
-    as premium, immediately flip them back to free.
-    """
+def load_subscriber_state(chat_id: int) -> SubscriberState:
+    """Read the chat's subscription row into the subscriber cache."""
+    state = UNREGISTERED
     conn = get_db_conn()
     try:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT subscription_type, expires_at
-                  FROM subscribers
-                 WHERE chat_id = %s
-                """,
-                (chat_id,),
-            )
+            execute_prepared(cur, SUBSCRIBER_SELECT_STATE, (chat_id,))
             row = cur.fetchone()
             if row:
-                sub_type, expires_at = row
-                if sub_type == "premium" and expires_at and expires_at < date.today():
-                    cur.execute(
-                        """
-                        UPDATE subscribers
-                           SET subscription_type = 'free',
-                               expires_at        = NULL
-                         WHERE chat_id = %s
-                        """,
-                        (chat_id,),
-                    )
-                    conn.commit()
+                state = SubscriberState(*row)
     finally:
         put_db_conn(conn)
+    subscriber_cache.put_state(chat_id, state)
+    return state
@@ -1,4 +1,5 @@
 import logging
+import re
 import textwrap
 from datetime import date, datetime
 from io import BytesIO
@@ -6,31 +7,60 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.error import BadRequest
 from telegram.ext import CallbackContext
 from psycopg2.extras import RealDictCursor
-from stockbot.database.connection import get_db_conn, put_db_conn
+from stockbot.database.connection import db_connection
+from stockbot.database.prepared import execute_prepared
+from stockbot.database import aio
+from stockbot.config import ASYNC_DB_ENABLED
 from stockbot.database.queries import SUBSCRIBER_CONSUME_FREE_CREDIT
+from stockbot.database.queries import (
+    STOCK_DATA_LATEST,
+    DIVIDENDS_SELECT,
+    DIVIDENDS_SELECT_YEAR,
+    DIVIDENDS_SELECT_YEARS,
+    INCOME_SELECT_YEARS,
+    INCOME_SELECT_YEAR,
+    INCOME_SELECT_REVENUE_YEAR,
+    INCOME_SELECT_LATEST,
+    BALANCE_SELECT_LATEST,
+    BALANCE_SELECT_YEARS
+)
 from stockbot.services.api.twelvedata import td_client, td_kwargs
+from stockbot.services.api.credits import handler_credit_context
 from stockbot.services.api.cache import (
     TD_QUOTE_CACHE,
     TD_TIME_SERIES_CACHE,
     TD_PROFILE_CACHE,
-    td_quote_cached,
+    td_quote_entry,
     td_ts_cached,
+    ts_frame,
+    td_profile_entry,
+    td_profile_cached,
+    td_statistics_cached,
+    td_dividends_cached,
+    td_income_statement_cached,
+    td_balance_sheet_cached,
     _make_key,
 )
+from stockbot.services.api.bar_store import get_bars
+from stockbot.services.charts import render_candles, candles_from_frame
 from stockbot.services.subscription import check_usage_quota_for_query
 from stockbot.services.rate_limiter import is_rate_limited
+from stockbot.services import subscriber_cache
 from stockbot.utils.formatting import format_huge_numbers, safe_format
 from stockbot.handlers.base import with_subscription_check
 from stockbot.services.ticker_service import parse_symbol
 from stockbot.templates.keyboards import get_main_keyboard
-import plotly.graph_objects as go
 from stockbot.handlers.texts import (
     SUMMARY_TEMPLATE,
     PROFILE_TEMPLATE,
     FINANCIAL_TEMPLATE,
     INCOME_TEMPLATE,
     BALANCE_TEMPLATE,
-    LEARN_TEMPLATE
+    LEARN_TEMPLATE,
+    STALE_QUOTE_NOTE,
+    STALE_PROFILE_NOTE,
+    AGE_SECONDS,
+    AGE_MINUTES
 )
 from stockbot.utils.formatting import arabic_day_name, arabic_exchange_name
 from stockbot.utils.helpers import get_arabic_name_from_db
@@ -41,7 +71,19 @@ from random import randint
 # For tracking cache hits in the summary branch
 CACHE_HIT_COUNTS = {}
 
+
+def _format_age(seconds: float) -> str:
+    """Age of a stale cache entry for the STALE_*_NOTE texts."""
+    if seconds >= 60:
+        return AGE_MINUTES.format(n=int(seconds // 60))
+    return AGE_SECONDS.format(n=int(seconds))
+
+def _credit_feature(update: Update) -> str:
+    # income_year_2023 / dividends_2021 -> income_year / dividends
+    return re.sub(r"_\d+$", "", update.callback_query.data or "")
+
 @with_subscription_check
+@handler_credit_context(_credit_feature)
 def button(update: Update, context: CallbackContext) -> None:
     query    = update.callback_query
     user_id  = query.from_user.id
@@ -79,21 +121,12 @@ def button(update: Update, context: CallbackContext) -> None:
             if not check_usage_quota_for_query(query, chat_id):
                 return
 
+            profile_age = None
             try:
                 # محاولة جلب من الـ DB
-                conn = get_db_conn()
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT * FROM stock_data
-                        WHERE symbol = %s
-                        ORDER BY updated_date DESC
-                        LIMIT 1
-                        """,
-                        (db_symbol,)
-                    )
+                with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    execute_prepared(cur, STOCK_DATA_LATEST, (db_symbol,))
                     profile = cur.fetchone()
-                put_db_conn(conn)
 
                 if not profile:
                     raise ValueError("Profile not found in DB")
@@ -118,10 +151,9 @@ def button(update: Update, context: CallbackContext) -> None:
 
             except Exception as db_error:
                 logging.warning(f"PostgreSQL profile fetch failed: {db_error}")
-                print("/profile fetch costs 10 credits")
-                prof = td_client.get_profile(symbol=api_symbol, **td_kwargs(is_saudi)).as_json()
+                prof, profile_age = td_profile_entry(td_client, symbol=api_symbol, **td_kwargs(is_saudi))
                 # name        = prof.get('name', api_symbol)
-                name = get_arabic_name_from_db(api_symbol) or profile.get('name', "غير متوفر")
+                name = get_arabic_name_from_db(api_symbol) or prof.get('name', "غير متوفر")
                 exchange    = prof.get('exchange', "غير متوفر")
                 sector      = prof.get('sector', "غير متوفر")
                 industry    = prof.get('industry', "غير متوفر")
@@ -159,6 +191,8 @@ def button(update: Update, context: CallbackContext) -> None:
                 fax=fax,
                 description=textwrap.shorten(description, width=300, placeholder="...")
             )
+            if profile_age is not None:
+                new_text += STALE_PROFILE_NOTE.format(age=_format_age(profile_age))
 
             return query.edit_message_text(
                 text=new_text,
@@ -205,7 +239,8 @@ def button(update: Update, context: CallbackContext) -> None:
                 return
 
             # Rate limiting
-            if is_rate_limited(user_id):
+            state = subscriber_cache.peek_state(chat_id)
+            if is_rate_limited(user_id, feature="summary", tier=state and state.effective_tier):
                 return query.answer(
                     "حاول تخفف من الضغط على الزر بشكل متكرر! 🙏",
                     show_alert=True,
@@ -215,13 +250,13 @@ def button(update: Update, context: CallbackContext) -> None:
 
             td_args = {"symbol": api_symbol, **td_kwargs(is_saudi)}
             cache_key = _make_key(**td_args)
-            cached_quote = TD_QUOTE_CACHE.get(cache_key)
-            if cached_quote is not None:
+            cached_quote = cache_key in TD_QUOTE_CACHE
+            if cached_quote:
                 CACHE_HIT_COUNTS[api_symbol] = CACHE_HIT_COUNTS.get(api_symbol, 0) + 1
 
             try:
-                quote = td_quote_cached(td_client, **td_args)  # ← pass td_client first
-                print("/quote fetch costs 1 credit")
+                # an expired quote comes back at once with its age, refreshed in the background
+                quote, quote_age = td_quote_entry(td_client, **td_args)  # ← pass td_client first
             except Exception as api_err:
                 logging.warning(f"Summary API error: {api_err}")
                 return query.edit_message_text(
@@ -281,6 +316,8 @@ def button(update: Update, context: CallbackContext) -> None:
                 high52=safe_format(high_52),
                 volume=format_huge_numbers(volume),
             )
+            if quote_age is not None:
+                new_text += STALE_QUOTE_NOTE.format(age=_format_age(quote_age))
 
             try:
                 return query.edit_message_text(
@@ -327,33 +364,18 @@ def button(update: Update, context: CallbackContext) -> None:
                 else:
                     days, interval, outputsize = 30,  "1h",    30*7
 
-                print("/time_series fetch costs 1 credit")
-                df = td_client.time_series(
+                # only bars newer than the stored ones are fetched
+                df = ts_frame(get_bars(
+                    td_client,
                     symbol=api_symbol,
                     interval=interval,
                     outputsize=outputsize,
                     **td_kwargs(is_saudi)
-                ).as_pandas()
+                ))
                 df['datetime'] = df.index.strftime('%Y-%m-%d %H:%M')
 
-                # بناء الرسم
-                fig = go.Figure()
-                fig.add_trace(go.Candlestick(
-                    x=df['datetime'],
-                    open=df['open'], high=df['high'], low=df['low'], close=df['close'],
-                    name="OHLC"
-                ))
-                fig.add_trace(go.Scatter(
-                    x=df['datetime'], y=df['close'],
-                    mode='lines', line=dict(width=1.5), name="Close"
-                ))
-                fig.update_layout(
-                    title=f"{api_symbol} History ({days}d)",
-                    xaxis_rangeslider_visible=False,
-                    template="plotly_white",
-                    width=960, height=480
-                )
-                buf = BytesIO(fig.to_image(format="png"))
+                # بناء الرسم (in the warm chart worker pool, see services/charts)
+                buf = BytesIO(render_candles(candles_from_frame(df), f"{api_symbol} History ({days}d)"))
                 buf.seek(0)
 
                 # إحصائيات إضافية
@@ -420,19 +442,9 @@ def button(update: Update, context: CallbackContext) -> None:
                 return
             query.answer()
             try:
-                conn = get_db_conn()
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT fiscal_year, dividend_date, amount
-                        FROM dividends
-                        WHERE symbol = %s
-                        ORDER BY fiscal_year DESC, dividend_date DESC
-                        """,
-                        (db_symbol,)
-                    )
+                with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    execute_prepared(cur, DIVIDENDS_SELECT, (db_symbol,))
                     rows = cur.fetchall()
-                put_db_conn(conn)
 
                 if not rows:
                     return query.edit_message_text(
@@ -472,30 +484,12 @@ def button(update: Update, context: CallbackContext) -> None:
         elif data.startswith("dividends_"):
             try:
                 year = int(data.split("_")[1])
-                conn = get_db_conn()
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT dividend_date, amount
-                        FROM dividends
-                        WHERE symbol = %s AND fiscal_year = %s
-                        ORDER BY dividend_date DESC
-                        """,
-                        (db_symbol, year)
-                    )
+                with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    execute_prepared(cur, DIVIDENDS_SELECT_YEAR, (db_symbol, year))
                     year_data = cur.fetchall()
 
-                    cur.execute(
-                        """
-                        SELECT DISTINCT fiscal_year
-                        FROM dividends
-                        WHERE symbol = %s
-                        ORDER BY fiscal_year DESC
-                        """,
-                        (db_symbol,)
-                    )
+                    execute_prepared(cur, DIVIDENDS_SELECT_YEARS, (db_symbol,))
                     all_years = [r['fiscal_year'] for r in cur.fetchall()]
-                put_db_conn(conn)
 
                 if not year_data:
                     message = f"📉 لا توجد توزيعات لعام {year} لـ {api_symbol}."
@@ -556,27 +550,16 @@ def button(update: Update, context: CallbackContext) -> None:
             query.answer()
 
             # 1) Load up to 5 recent years from DB only
-            conn = get_db_conn()
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT DISTINCT EXTRACT(YEAR FROM "Fiscal_Date") AS yr
-                          FROM income_statements
-                         WHERE "Ticker" = %s
-                           AND "Statement_Type" = 'Annual'
-                         ORDER BY yr DESC
-                         LIMIT 5
-                    """, (db_symbol,))
-                    years = [int(r['yr']) for r in cur.fetchall()]
-            finally:
-                put_db_conn(conn)
+            with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                execute_prepared(cur, INCOME_SELECT_YEARS, (db_symbol,))
+                years = [int(r['yr']) for r in cur.fetchall()]
 
             # 2) If DB has no years, fetch ONLY the year list via API (no statement data yet)
             if not years:
                 logging.info(f"No DB years for {api_symbol}; pulling year list from API")
-                inc_json = td_client.get_income_statement(
-                    symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
-                ).as_json().get("income_statement", [])
+                inc_json = td_income_statement_cached(
+                    td_client, symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
+                ).get("income_statement", [])
                 years = sorted({
                     int(item.get("fiscal_date", "")[:4])  # Use underscore
                     for item in inc_json if item.get("fiscal_date")
@@ -606,63 +589,34 @@ def button(update: Update, context: CallbackContext) -> None:
             query.answer()
 
             # 1) Re‑fetch years list (DB first, fallback to API for list only)
-            conn = get_db_conn()
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT DISTINCT EXTRACT(YEAR FROM "Fiscal_Date") AS yr
-                          FROM income_statements
-                         WHERE "Ticker" = %s
-                           AND "Statement_Type" = 'Annual'
-                         ORDER BY yr DESC
-                         LIMIT 5
-                    """, (db_symbol,))
-                    years = [int(r['yr']) for r in cur.fetchall()]
-            finally:
-                put_db_conn(conn)
+            with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                execute_prepared(cur, INCOME_SELECT_YEARS, (db_symbol,))
+                years = [int(r['yr']) for r in cur.fetchall()]
 
             if not years:
                 logging.info(f"No DB years for {api_symbol}; pulling list from API")
-                inc_json = td_client.get_income_statement(
-                    symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
-                ).as_json().get("income_statement", [])
+                inc_json = td_income_statement_cached(
+                    td_client, symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
+                ).get("income_statement", [])
                 years = sorted({
                     int(item.get("fiscal_date", "")[:4])
                     for item in inc_json if item.get("fiscal_date")
                 }, reverse=True)[:5]
 
             # 2) Fetch income data for the selected year (DB first)
-            conn = get_db_conn()
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT *
-                          FROM income_statements
-                         WHERE "Ticker" = %s
-                           AND EXTRACT(YEAR FROM "Fiscal_Date") = %s
-                           AND "Statement_Type" = 'Annual'
-                         LIMIT 1
-                    """, (db_symbol, year))
-                    inc = cur.fetchone()
+            with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                execute_prepared(cur, INCOME_SELECT_YEAR, (db_symbol, year))
+                inc = cur.fetchone()
 
-                    cur.execute("""
-                        SELECT "TotalRevenue"
-                          FROM income_statements
-                         WHERE "Ticker" = %s
-                           AND EXTRACT(YEAR FROM "Fiscal_Date") = %s
-                           AND "Statement_Type" = 'Annual'
-                         LIMIT 1
-                    """, (db_symbol, year - 1))
-                    prev_row = cur.fetchone()
-            finally:
-                put_db_conn(conn)
+                execute_prepared(cur, INCOME_SELECT_REVENUE_YEAR, (db_symbol, year - 1))
+                prev_row = cur.fetchone()
 
             # 3) If DB row missing, fetch FULL statement from API now (this is the only credit‑consuming point)
             if not inc:
                 logging.info(f"No DB income row for {api_symbol} {year}; fetching via API")
-                inc_json = td_client.get_income_statement(
-                    symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
-                ).as_json().get("income_statement", [])
+                inc_json = td_income_statement_cached(
+                    td_client, symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
+                ).get("income_statement", [])
                 latest = next((r for r in inc_json if r.get("fiscal_date", "").startswith(str(year))), {})
                 prev_api = next((r for r in inc_json if r.get("fiscal_date", "").startswith(str(year - 1))), {})
 
@@ -762,24 +716,15 @@ def button(update: Update, context: CallbackContext) -> None:
             query.answer()
 
             # 1) Try DB for up to 5 recent years
-            conn = get_db_conn()
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT DISTINCT EXTRACT(YEAR FROM "Fiscal_Date") AS yr
-                      FROM balance_sheets
-                     WHERE "Ticker" = %s
-                       AND "Statement_Type" = 'Annual'
-                     ORDER BY yr DESC
-                     LIMIT 5
-                """, (db_symbol,))
+            with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                execute_prepared(cur, BALANCE_SELECT_YEARS, (db_symbol,))
                 years = [int(r['yr']) for r in cur.fetchall()]
-            put_db_conn(conn)
 
             # 2) Fallback to API if no DB data
             if not years:
-                bal_json = td_client.get_balance_sheet(
-                    symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
-                ).as_json().get("balance_sheet", [])
+                bal_json = td_balance_sheet_cached(
+                    td_client, symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
+                ).get("balance_sheet", [])
                 years = sorted({
                     int(item.get("fiscal_date", "")[:4])
                     for item in bal_json if item.get("fiscal_date")
@@ -810,14 +755,8 @@ def button(update: Update, context: CallbackContext) -> None:
 
             years = []
             try:
-                conn = get_db_conn()
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT DISTINCT EXTRACT(YEAR FROM "Fiscal_Date") AS yr
-                        FROM balance_sheets
-                        WHERE "Ticker" = %s AND "Statement_Type" = 'Annual'
-                        ORDER BY yr DESC LIMIT 5
-                    """, (db_symbol,))
+                with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    execute_prepared(cur, BALANCE_SELECT_YEARS, (db_symbol,))
                     years = [int(r['yr']) for r in cur.fetchall()]
 
                     # current year
@@ -839,7 +778,6 @@ def button(update: Update, context: CallbackContext) -> None:
                         LIMIT 1
                     """, (db_symbol, year - 1))
                     prev_row = cur.fetchone()
-                put_db_conn(conn)
 
                 if not bal:
                     raise ValueError("No DB row")
@@ -855,9 +793,9 @@ def button(update: Update, context: CallbackContext) -> None:
             except Exception as e:
                 logging.warning(f"DB balance fetch failed ({api_symbol} {year}): {e}")
 
-                bal_json = td_client.get_balance_sheet(
-                    symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
-                ).as_json().get("balance_sheet", [])
+                bal_json = td_balance_sheet_cached(
+                    td_client, symbol=api_symbol, period='annual', **td_kwargs(is_saudi)
+                ).get("balance_sheet", [])
 
                 # find exact year
                 latest = next((r for r in bal_json if r.get("fiscal_date", "").startswith(str(year))), {})
@@ -929,51 +867,28 @@ def button(update: Update, context: CallbackContext) -> None:
             try:
                 try:
                     # === Fetch required data from PostgreSQL via pool =============
-                    conn = get_db_conn()  # 🆕 lease connection
-                    try:
-                        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                            # Latest annual income statement
-                            cur.execute(
-                                """
-                                SELECT *
-                                FROM income_statements
-                                WHERE "Ticker" = %s
-                                  AND "Statement_Type" = 'Annual'
-                                ORDER BY "Fiscal_Date" DESC
-                                LIMIT 1;
-                                """,
-                                (db_symbol,),
+                    if ASYNC_DB_ENABLED:
+                        # the three lookups are independent: run them concurrently
+                        latest_income, latest_balance, stock_data = (
+                            row or {} for row in aio.run_all(
+                                aio.fetch_income_statement(db_symbol),
+                                aio.fetch_latest_balance_sheet(db_symbol),
+                                aio.fetch_stock_data(db_symbol),
                             )
+                        )
+                    else:
+                        with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                            # Latest annual income statement
+                            execute_prepared(cur, INCOME_SELECT_LATEST, (db_symbol,))
                             latest_income = cur.fetchone() or {}
 
                             # Latest annual balance sheet
-                            cur.execute(
-                                """
-                                SELECT *
-                                FROM balance_sheets
-                                WHERE "Ticker" = %s
-                                  AND "Statement_Type" = 'Annual'
-                                ORDER BY "Fiscal_Date" DESC
-                                LIMIT 1;
-                                """,
-                                (db_symbol,),
-                            )
+                            execute_prepared(cur, BALANCE_SELECT_LATEST, (db_symbol,))
                             latest_balance = cur.fetchone() or {}
 
                             # Latest market‑cap snapshot
-                            cur.execute(
-                                """
-                                SELECT *
-                                FROM stock_data
-                                WHERE symbol = %s
-                                ORDER BY updated_date DESC
-                                LIMIT 1;
-                                """,
-                                (db_symbol,),
-                            )
+                            execute_prepared(cur, STOCK_DATA_LATEST, (db_symbol,))
                             stock_data = cur.fetchone() or {}
-                    finally:
-                        put_db_conn(conn)  # 🆕 release to pool
 
                     print(f"✅ [Data Source] PostgreSQL database used for {api_symbol}")
 
@@ -985,16 +900,13 @@ def button(update: Update, context: CallbackContext) -> None:
 
                 except Exception as db_error:
                     logging.warning(f"PostgreSQL fetch failed. Falling back to API. Error: {str(db_error)}")
-                    print("/income_statement fetch costs 100 credits per symbol")
-                    print("/balance_sheet fetch costs 100 credits per symbol")
-                    print("/statistics fetch costs 50 credits per symbol")
 
                     # === Fallback to TwelveData API ===
-                    income = td_client.get_income_statement(symbol=api_symbol, period='annual',
-                                                            **td_kwargs(is_saudi)).as_json()
-                    balance = td_client.get_balance_sheet(symbol=api_symbol, period='annual',
-                                                          **td_kwargs(is_saudi)).as_json()
-                    stats = td_client.get_statistics(symbol=api_symbol, **td_kwargs(is_saudi)).as_json()
+                    income = td_income_statement_cached(td_client, symbol=api_symbol, period='annual',
+                                                        **td_kwargs(is_saudi))
+                    balance = td_balance_sheet_cached(td_client, symbol=api_symbol, period='annual',
+                                                      **td_kwargs(is_saudi))
+                    stats = td_statistics_cached(td_client, symbol=api_symbol, **td_kwargs(is_saudi))
 
                     latest_income = income.get("income_statement", [{}])[0]
                     latest_balance = balance.get("balance_sheet", [{}])[0]
@@ -1111,14 +1023,9 @@ def button(update: Update, context: CallbackContext) -> None:
 
             # ── Load raw stats (DB first, then API fallback) ───────────────────────
             try:
-                conn = get_db_conn()
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        "SELECT * FROM stock_data WHERE symbol=%s ORDER BY updated_date DESC LIMIT 1",
-                        (db_symbol,)
-                    )
+                with db_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    execute_prepared(cur, STOCK_DATA_LATEST, (db_symbol,))
                     sd = cur.fetchone()
-                put_db_conn(conn)
 
                 if not sd:
                     raise ValueError("No stats in DB")
@@ -1128,9 +1035,9 @@ def button(update: Update, context: CallbackContext) -> None:
 
             except Exception as db_err:
                 logging.warning(f"Stats DB failed: {db_err}")
-                prof = td_client.get_profile(symbol=api_symbol, **td_kwargs(is_saudi)).as_json()
-                stat = td_client.get_statistics(symbol=api_symbol, **td_kwargs(is_saudi)).as_json()
-                divs = td_client.get_dividends(symbol=api_symbol, **td_kwargs(is_saudi)).as_json()
+                prof = td_profile_cached(td_client, symbol=api_symbol, **td_kwargs(is_saudi))
+                stat = td_statistics_cached(td_client, symbol=api_symbol, **td_kwargs(is_saudi))
+                divs = td_dividends_cached(td_client, symbol=api_symbol, **td_kwargs(is_saudi))
 
                 name = get_arabic_name_from_db(api_symbol) or api_symbol
                 # flatten API response into same keys as DB
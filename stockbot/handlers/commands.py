@@ -4,6 +4,7 @@ from datetime import date
 from telegram import Update
 from telegram.ext import CallbackContext
 from stockbot.database.connection import get_db_conn, put_db_conn
+from stockbot.database.prepared import execute_prepared
 from stockbot.database.queries import (
     SUBSCRIBER_SELECT,
     SUBSCRIBER_UPDATE_PROFILE,
@@ -12,17 +13,14 @@ from stockbot.database.queries import (
     FREE_DAILY_FEATURE_LIMIT
 )
 from stockbot.handlers.base import with_subscription_check
+from stockbot.services import subscriber_cache
+from stockbot.services.subscriber_cache import SubscriberState
 from stockbot.handlers.texts import (
     LEARN_TEMPLATE
 )
 from stockbot.templates.keyboards import get_main_keyboard
-from stockbot.services.cashflow_etl import refresh_cashflow_test
-from stockbot.services.income_etl  import refresh_income_test
-from stockbot.services.balance_etl import refresh_balance_test
-from stockbot.services.stockinfo_etl import refresh_stockinfo_test
-from stockbot.services.dividends_etl import refresh_dividends_test
-from stockbot.services.daily_closes_etl import refresh_daily_closes
-from stockbot.services.shariah_etl import update_shariah_table
+# The ETL modules pull in pandas/yfinance/bs4, so each refresh command imports
+# its ETL when it runs instead of at startup.
 
 @with_subscription_check
 def start(update: Update, context: CallbackContext) -> None:
@@ -33,7 +31,7 @@ def start(update: Update, context: CallbackContext) -> None:
     conn = get_db_conn()
     try:
         with conn.cursor() as cur:
-            cur.execute(SUBSCRIBER_SELECT, (chat_id,))
+            execute_prepared(cur, SUBSCRIBER_SELECT, (chat_id,))
             row = cur.fetchone()
 
             if row:
@@ -41,7 +39,8 @@ def start(update: Update, context: CallbackContext) -> None:
                 sub_type, expires_at, last_reset, usage_count, usage_limit = row
 
                 if sub_type == 'premium' and expires_at and expires_at >= today:
-                    cur.execute(
+                    execute_prepared(
+                        cur,
                         SUBSCRIBER_UPDATE_PROFILE,
                         (user.first_name, user.username, user.language_code, chat_id)
                     )
@@ -53,7 +52,8 @@ def start(update: Update, context: CallbackContext) -> None:
 
                 reset_usage = (last_reset is None) or (last_reset < today)
 
-                cur.execute(
+                execute_prepared(
+                    cur,
                     SUBSCRIBER_UPDATE_FREE,
                     (
                         user.first_name,
@@ -69,7 +69,8 @@ def start(update: Update, context: CallbackContext) -> None:
 
             else:
                 usage_count, usage_limit = 0, FREE_DAILY_FEATURE_LIMIT
-                cur.execute(
+                execute_prepared(
+                    cur,
                     SUBSCRIBER_INSERT,
                     (
                         chat_id,
@@ -83,6 +84,7 @@ def start(update: Update, context: CallbackContext) -> None:
 
     finally:
         put_db_conn(conn)
+        subscriber_cache.invalidate(chat_id)
 
     update.message.reply_text(
         "👋 أهلاً بك في البوت!\n\n"
@@ -119,7 +121,8 @@ def status(update: Update, context: CallbackContext) -> None:
                 update.message.reply_text("⚠️ اشتراكك غير مفعل حالياً.\nأرسل الأمر /start لإعادة تفعيل الوصول.")
                 return
 
-            if subscription_type == 'premium':
+            state = SubscriberState(subscription_type, expires_at, usage_limit)
+            if state.effective_tier == 'premium':
                 exp_text = (
                     f"🗓️ تاريخ انتهاء الاشتراك: {expires_at.strftime('%Y-%m-%d')}"
                     if expires_at else "∞ بدون تاريخ انتهاء"
@@ -166,6 +169,7 @@ def grant_premium(update: Update, context: CallbackContext):
             conn.commit()
     finally:
         put_db_conn(conn)
+    subscriber_cache.invalidate(chat_id)
 
     update.message.reply_text(f"✅ تم ترقية المستخدم {chat_id} إلى الباقة المدفوعة لمدة 30 يومًا.")
 
@@ -181,6 +185,7 @@ def help_command(update, context):
 def refresh_cf_db(update: Update, context: CallbackContext) -> None:
     update.message.reply_text("🔄 جاري تحديث بيانات التدفقات النقدية... الرجاء الانتظار.")
     try:
+        from stockbot.services.cashflow_etl import refresh_cashflow_test
         count = refresh_cashflow_test()
         if count:
             update.message.reply_text(f"✅ تم إدراج/تحديث {count} صف في الجدول بنجاح.")
@@ -193,6 +198,7 @@ def refresh_cf_db(update: Update, context: CallbackContext) -> None:
 def refresh_is_db(update: Update, context: CallbackContext) -> None:
     update.message.reply_text("🔄 جاري تحديث القوائم المالية... الرجاء الانتظار.")
     try:
+        from stockbot.services.income_etl import refresh_income_test
         count = refresh_income_test()
         if count:
             update.message.reply_text(f"✅ تم إدراج/تحديث {count} صف في جدول القوائم المالية بنجاح.")
@@ -209,6 +215,7 @@ def refresh_bs_db(update: Update, context: CallbackContext) -> None:
     """
     update.message.reply_text("🔄 جاري تحديث القوائم المالية (الميزانيات)... الرجاء الانتظار.")
     try:
+        from stockbot.services.balance_etl import refresh_balance_test
         count = refresh_balance_test()
         if count:
             update.message.reply_text(f"✅ تم إدراج/تحديث {count} صف في جدول الميزانيات بنجاح.")
@@ -224,6 +231,7 @@ def refresh_stockinfo_db(update: Update, context: CallbackContext) -> None:
     """
     update.message.reply_text("🔄 جاري تحديث بيانات الأسهم... الرجاء الانتظار.")
     try:
+        from stockbot.services.stockinfo_etl import refresh_stockinfo_test
         count = refresh_stockinfo_test()
         if count:
             update.message.reply_text(
@@ -242,6 +250,7 @@ def refresh_dividends_db(update: Update, context: CallbackContext) -> None:
     """
     update.message.reply_text("🔄 جاري تحديث توزيعات الأرباح... الرجاء الانتظار.")
     try:
+        from stockbot.services.dividends_etl import refresh_dividends_test
         count = refresh_dividends_test()
         if count:
             update.message.reply_text(
@@ -259,6 +268,7 @@ def refresh_daily_closes_db(update: Update, context: CallbackContext) -> None:
     """
     update.message.reply_text("🔄 جاري تحديث أسعار الإغلاق اليومية... الرجاء الانتظار.")
     try:
+        from stockbot.services.daily_closes_etl import refresh_daily_closes
         count = refresh_daily_closes()
         if count:
             update.message.reply_text(
@@ -277,6 +287,7 @@ def refresh_shariah_db(update: Update, context: CallbackContext) -> None:
     """
     update.message.reply_text("🔍 جاري تحديث قائمة الأسهم المتوافقة مع الشريعة... الرجاء الانتظار.")
     try:
+        from stockbot.services.shariah_etl import update_shariah_table
         count = update_shariah_table()
         update.message.reply_text(f"✅ تم إدراج/تحديث {count} صفًا في جدول الأسهم الشرعية.")
     except Exception as e:
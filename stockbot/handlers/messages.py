@@ -28,6 +28,10 @@ def handle_message(update, context):
         )
 
     matches = find_top_matches(raw_input)
+    if matches is None:
+        return update.message.reply_text(
+            "⏳ The ticker list is still loading. Please try again in a moment."
+        )
     if matches:
         buttons = [
             [InlineKeyboardButton(f"{name} ({sym})", callback_data=f"select_{sym}")]
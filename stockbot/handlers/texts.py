@@ -36,6 +36,12 @@ SUMMARY_TEMPLATE = (
     "🔄 *" + LBL_VOLUME + ":* {volume}\u200C"
 )
 
+# appended to the summary when the quote came from an expired cache entry
+STALE_QUOTE_NOTE = "\n\n⏳ _السعر من قبل {age}، وجاري تحديثه الآن_"
+STALE_PROFILE_NOTE = "\n\n⏳ _بيانات الشركة من قبل {age}، وجاري تحديثها الآن_"
+AGE_SECONDS = "{n} ثانية"
+AGE_MINUTES = "{n} دقيقة"
+
 # ── Arabic Labels (for company profile) ─────────────────────
 LBL_PROFILE       = "معلومات الشركة"
 LBL_MAIN_EXCHANGE = "السوق الرئيسي"
@@ -1,5 +1,8 @@
 # stockbot/main.py
 import os
+import time
+import logging
+_IMPORT_STARTED = time.perf_counter()
 from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters, ConversationHandler
 from telegram import BotCommand, BotCommandScopeDefault, BotCommandScopeChat
 from stockbot.handlers.commands import (
@@ -19,12 +22,106 @@ from stockbot.handlers.callbacks import button
 from stockbot.handlers.base import with_subscription_check, start_activation, handle_activation_code, cancel_activation
 from stockbot.handlers.errors import global_error_handler
 from stockbot.handlers import messages
-from stockbot.services.daily_closes_etl import refresh_daily_closes
 
 
 from apscheduler.schedulers.background import BackgroundScheduler
-from stockbot.services.subscription import reset_daily_usage
+from stockbot.services.subscription import reset_daily_usage, downgrade_expired_subscribers
+from stockbot.services.ticker_service import (
+    reload_ticker_universe,
+    load_ticker_names,
+    load_ticker_names_async,
+    search_cache_stats,
+)
+from stockbot.config import TICKER_RELOAD_MINUTES, LAZY_STARTUP, STARTUP_PROFILE, LOG_LEVEL
+from stockbot.utils.startup import import_profile, format_import_profile
+from stockbot.services.subscriber_cache import subscriber_cache_stats
+from stockbot.database.connection import pool_stats
+from stockbot.services.api.cache import td_cache_stats, td_flight_stats, td_batch_stats, td_revalidate_stats
+from stockbot.services.rate_limiter import purge_idle_buckets
+from stockbot.services.api.credits import credit_stats
+from stockbot.services.api.bar_store import bar_stats
+from stockbot.services.charts import warm_chart_pool, chart_stats
+_IMPORT_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
+
+
+def refresh_daily_closes():
+    # imported on first run: the ETL pulls in pandas
+    from stockbot.services.daily_closes_etl import refresh_daily_closes as run_etl
+    return run_etl()
+
+
+def log_cache_stats():
+    caches = [("subscriber", subscriber_cache_stats()), ("ticker search", search_cache_stats())]
+    caches += [(f"twelvedata {name}", stats) for name, stats in td_cache_stats().items()]
+    for name, stats in caches:
+        logging.info(
+            f"📈 {name} cache: hit ratio {stats['hit_ratio']:.1%} "
+            f"({stats['hits']} hits / {stats['misses']} misses, {stats['size']} entries)"
+            + (f", {stats['stale_hits']} served stale" if stats.get("stale_hits") else "")
+        )
+    for name, stats in td_flight_stats().items():
+        logging.info(
+            f"🛬 twelvedata {name} single-flight: {stats['calls']} upstream calls, "
+            f"{stats['merged']} merged, {stats['timeouts']} timeouts, {stats['errors']} errors"
+        )
+    stats = td_revalidate_stats()
+    logging.info(
+        f"♻️ twelvedata background refreshes: {stats['started']} started, "
+        f"{stats['failed']} failed, {stats['pending']} pending"
+    )
+    stats = bar_stats()
+    logging.info(
+        f"🕯️ twelvedata bar store: {stats['full']} full / {stats['incremental']} incremental fetches "
+        f"({stats['rows']} rows), {stats['fresh']} served as-is, {stats['size']} series"
+    )
+    stats = td_batch_stats()
+    logging.info(
+        f"📦 twelvedata quote batches: {stats['calls']} calls for {stats['symbols']} symbols "
+        f"({stats['symbols_per_call']:.1f} per call)"
+    )
+    stats = chart_stats()
+    logging.info(
+        f"📊 charts: {stats['renders']} rendered (avg {stats['render_ms_avg']:.0f} ms), "
+        f"{stats['timeouts']} timeouts, {stats['errors']} errors, {stats['started']} workers started"
+    )
+
+
+def log_credit_stats():
+    stats = credit_stats()
+    logging.info(
+        f"💳 TwelveData credits: {stats['credits']} spent in {stats['calls']} calls "
+        f"({stats['window']} in the last minute), {stats['queued']} calls queued "
+        f"for {stats['queued_seconds']:.0f}s, {stats['rejected']} rejected"
+    )
+    for feature, spent in stats["by_feature"].items():
+        logging.info(f"💳   {feature}: {spent} credits")
+    for user, spent in stats["top_users"]:
+        logging.info(f"💳   user {user}: {spent} credits")
+
+
+def log_pool_stats():
+    for partition, stats in pool_stats().items():
+        logging.info(
+            f"🚰 DB pool [{partition}]: {stats['in_use']}/{stats['max']} in use, "
+            f"wait avg {stats['wait_ms_avg']:.1f} ms (max {stats['wait_ms_max']:.0f}), "
+            f"lease avg {stats['lease_ms_avg']:.1f} ms (max {stats['lease_ms_max']:.0f}), "
+            f"{stats['timeouts']} timeouts, {stats['leaks']} slow returns"
+        )
+        for holder, seconds in stats["overdue"]:
+            logging.warning(f"🚰 DB connection [{partition}] leased by {holder} for {seconds}s and not returned")
+
+
 def main() -> None:
+    started = time.perf_counter()
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if LAZY_STARTUP:
+        # start answering updates right away; the universe loads in the background
+        load_ticker_names_async()
+        profile = import_profile()
+    else:
+        load_ticker_names()
+        profile = import_profile(load=True)
+
     updater = Updater(os.getenv("BOT_TOKEN"))
     dispatcher = updater.dispatcher
 
@@ -39,6 +136,15 @@ def main() -> None:
         id="daily_usage_reset"
     )
 
+    # flip lapsed premium subscriptions in bulk; hourly so that a lapse is
+    # picked up soon after midnight whatever the server's local date is
+    scheduler.add_job(
+        downgrade_expired_subscribers,
+        trigger="cron",
+        minute=0,
+        id="expiry_sweep"
+    )
+
     scheduler.add_job(
         refresh_daily_closes,
         trigger="cron",
@@ -48,6 +154,48 @@ def main() -> None:
         id="daily_closes_etl"
     )
 
+    # pick up new listings in tickers_ar_en (search index, registry, COMPANIES)
+    scheduler.add_job(
+        reload_ticker_universe,
+        trigger="interval",
+        minutes=TICKER_RELOAD_MINUTES,
+        id="ticker_universe_reload"
+    )
+
+    scheduler.add_job(
+        log_cache_stats,
+        trigger="interval",
+        hours=1,
+        id="cache_stats_report"
+    )
+
+    # once, right away: start the chart workers before the first history request
+    scheduler.add_job(
+        warm_chart_pool,
+        id="chart_pool_warmup"
+    )
+
+    scheduler.add_job(
+        log_credit_stats,
+        trigger="interval",
+        hours=1,
+        id="credit_stats_report"
+    )
+
+    scheduler.add_job(
+        purge_idle_buckets,
+        trigger="interval",
+        hours=1,
+        id="rate_limit_purge"
+    )
+
+    scheduler.add_job(
+        log_pool_stats,
+        trigger="interval",
+        minutes=5,
+        id="db_pool_report"
+    )
+
     scheduler.start()
 
 
@@ -122,6 +270,10 @@ def main() -> None:
     dispatcher.add_error_handler(global_error_handler)
 
     updater.start_polling()
+    if STARTUP_PROFILE:
+        # INFO, like the other reports: shown at the default LOG_LEVEL set above
+        logging.info(format_import_profile(profile, _IMPORT_MS))
+        logging.info(f"⏱️ polling started {(time.perf_counter() - started) * 1000:.0f} ms after main()")
     # (Scheduler will keep running in background)
     updater.idle()
 
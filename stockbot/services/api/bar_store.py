@@ -0,0 +1,96 @@
+# stockbot/services/api/bar_store.py
+import logging
+import threading
+import time
+from stockbot.config import TD_TIME_SERIES_OPEN_TTL, TD_BAR_WINDOW, TD_BAR_RETENTION
+from stockbot.config import TD_DISK_CACHE_MAX_ENTRIES
+from stockbot.services import market_hours
+from stockbot.services.api.cache import TD_DISK_STORE, SingleFlight, _is_saudi, _make_key
+from stockbot.services.api.tiered_cache import TieredCache
+
+# (symbol, interval, country) -> {"bars": [...] oldest first, "depth", "fresh_until"}
+# kept for TD_BAR_RETENTION; whether the bars are current is "fresh_until"
+TD_BAR_CACHE = TieredCache("bars", maxsize=1_000, ttl=TD_BAR_RETENTION,
+                           disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES)
+_BAR_FLIGHT = SingleFlight("bars")
+
+BAR_STATS = {"full": 0, "incremental": 0, "fresh": 0, "rows": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(outcome: str, rows: int = 0) -> None:
+    with _STATS_LOCK:
+        BAR_STATS[outcome] += 1
+        BAR_STATS["rows"] += rows
+
+
+def _fetch(td_client, **kwargs) -> list:
+    """time_series rows, oldest first."""
+    rows = td_client.time_series(**kwargs).as_json()
+    return sorted(rows, key=lambda r: r["datetime"])
+
+
+def _merge(bars: list, new: list, window: int) -> list:
+    # the last stored bar comes back too (start_date is inclusive) and wins,
+    # since it may have been a partial bar when it was first fetched
+    merged = {bar["datetime"]: bar for bar in bars}
+    merged.update((bar["datetime"], bar) for bar in new)
+    return [merged[dt] for dt in sorted(merged)][-window:]
+
+
+def _refresh(td_client, key, entry, outputsize: int, kwargs) -> dict:
+    if entry is not None and entry["fresh_until"] > time.time() and entry["depth"] >= outputsize:
+        _count("fresh")
+        return entry
+
+    if entry is None or entry["depth"] < outputsize or not entry["bars"]:
+        depth = min(max(outputsize, entry["depth"] if entry else 0), TD_BAR_WINDOW)
+        new = _fetch(td_client, outputsize=depth, **kwargs)
+        bars = new[-depth:]
+        _count("full", len(new))
+    else:
+        depth = entry["depth"]
+        new = _fetch(td_client, start_date=entry["bars"][-1]["datetime"], outputsize=depth, **kwargs)
+        bars = _merge(entry["bars"], new, depth)
+        _count("incremental", len(new))
+
+    exchange = market_hours.exchange_for(_is_saudi(kwargs))
+    entry = {
+        "bars": bars,
+        "depth": depth,
+        "fresh_until": time.time() + market_hours.cache_ttl(exchange, TD_TIME_SERIES_OPEN_TTL),
+    }
+    TD_BAR_CACHE.set(key, entry)
+    return entry
+
+
+def get_bars(td_client, symbol: str, interval: str, outputsize: int, **kwargs) -> list:
+    """
+    The latest `outputsize` bars, newest first like time_series().as_json().
+    The first request for a (symbol, interval) fetches the whole window;
+    after that only bars from the last stored one onwards are requested and
+    merged in, so a refresh moves a handful of rows instead of the lot.
+    At most TD_BAR_WINDOW bars are kept, so larger requests get that many.
+    """
+    outputsize = min(outputsize, TD_BAR_WINDOW)
+    kwargs = dict(kwargs, symbol=symbol, interval=interval)
+    key = _make_key(**kwargs)
+
+    def load():
+        # re-read inside the flight: a caller just ahead of us may have refreshed it
+        return _refresh(td_client, key, TD_BAR_CACHE.peek(key), outputsize, kwargs)
+
+    entry = TD_BAR_CACHE.get(key)
+    if entry is None or entry["fresh_until"] <= time.time() or entry["depth"] < outputsize:
+        try:
+            entry = _BAR_FLIGHT.do(key, load)
+        except Exception as e:
+            if entry is None:
+                raise
+            logging.warning(f"Bar refresh for {key} failed, serving stored bars: {e}")
+    return entry["bars"][-outputsize:][::-1]
+
+
+def bar_stats() -> dict:
+    with _STATS_LOCK:
+        return dict(BAR_STATS, size=len(TD_BAR_CACHE))
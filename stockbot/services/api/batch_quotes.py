@@ -0,0 +1,115 @@
+# stockbot/services/api/batch_quotes.py
+import logging
+import threading
+from concurrent.futures import Future
+from stockbot.services.api.credits import credit_context, current_context
+from stockbot.config import TD_BATCH_WINDOW_MS, TD_BATCH_MAX_SYMBOLS, TD_SINGLEFLIGHT_TIMEOUT
+
+
+class QuoteError(Exception):
+    """TwelveData returned an error entry for one symbol of a batch."""
+
+
+class QuoteBatcher:
+    """
+    Collects quote requests for a short window and sends them as one
+    comma-separated /quote call per request group (same country etc.),
+    then hands each caller its own symbol's quote.
+    TwelveData still bills one credit per symbol; what a batch saves is the
+    HTTP round trips and the per-call overhead on both sides.
+    """
+
+    def __init__(self, client, window: float = TD_BATCH_WINDOW_MS / 1000,
+                 max_symbols: int = TD_BATCH_MAX_SYMBOLS):
+        self.client = client
+        self.window = window
+        self.max_symbols = max_symbols
+        self._pending = {}  # group -> {symbol: Future}
+        self._lock = threading.Lock()
+        self.stats = {"symbols": 0, "calls": 0}
+
+    # ─── synchronous bulk fetch ────────────────────────────────────────────
+    def fetch_many(self, symbols, **kwargs) -> dict:
+        """
+        {symbol: quote dict or QuoteError}, one /quote call per
+        `max_symbols` chunk; each call is charged by services.api.credits.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        results = {}
+        for start in range(0, len(symbols), self.max_symbols):
+            chunk = symbols[start:start + self.max_symbols]
+            results.update(self._call(chunk, kwargs))
+        return results
+
+    def _call(self, symbols, kwargs) -> dict:
+        data = self.client.quote(symbol=",".join(symbols), **kwargs).as_json()
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["symbols"] += len(symbols)
+        if len(symbols) == 1:
+            # a single-symbol request returns the quote itself, not a mapping
+            data = {symbols[0]: data}
+        results = {}
+        for sym in symbols:
+            quote = data.get(sym)
+            if not isinstance(quote, dict):
+                results[sym] = QuoteError(f"{sym}: missing from batch response")
+            elif quote.get("status") == "error" or "code" in quote:
+                results[sym] = QuoteError(f"{sym}: {quote.get('message', quote)}")
+            else:
+                results[sym] = quote
+        return results
+
+    # ─── windowed single-symbol requests ───────────────────────────────────
+    def submit(self, symbol: str, **kwargs) -> Future:
+        group = tuple(sorted(kwargs.items()))
+        with self._lock:
+            pending = self._pending.get(group)
+            if pending is None:
+                pending = self._pending[group] = {}
+                # the batch is sent from the timer thread, charged to whoever opened it
+                timer = threading.Timer(self.window, self._flush, (group, pending, current_context()))
+                timer.daemon = True
+                timer.start()
+            future = pending.get(symbol)
+            if future is None:
+                future = pending[symbol] = Future()
+            full = len(pending) >= self.max_symbols
+            if full:
+                del self._pending[group]
+        if full:
+            self._run(group, pending)
+        return future
+
+    def get(self, symbol: str, timeout: float = TD_SINGLEFLIGHT_TIMEOUT, **kwargs) -> dict:
+        """Quote for one symbol, fetched together with whatever else is pending."""
+        return self.submit(symbol, **kwargs).result(timeout)
+
+    def _flush(self, group, pending, ctx) -> None:
+        with self._lock:
+            # already sent because it filled up before the window closed
+            if self._pending.get(group) is not pending:
+                return
+            del self._pending[group]
+        with credit_context(*ctx):
+            self._run(group, pending)
+
+    def _run(self, group, pending) -> None:
+        try:
+            results = self._call(list(pending), dict(group))
+        except Exception as e:
+            logging.warning(f"Batch quote for {len(pending)} symbols failed: {e}")
+            for future in pending.values():
+                future.set_exception(e)
+            return
+        for sym, future in pending.items():
+            result = results[sym]
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def batch_stats(self) -> dict:
+        with self._lock:
+            calls, symbols = self.stats["calls"], self.stats["symbols"]
+        return {"calls": calls, "symbols": symbols, "symbols_per_call": symbols / calls if calls else 0.0}
@@ -1,17 +1,298 @@
-from cachetools import TTLCache, cached
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+from stockbot.config import TD_DISK_CACHE_PATH, TD_DISK_CACHE_MAX_ENTRIES, TD_SINGLEFLIGHT_TIMEOUT
+from stockbot.config import TD_QUOTE_OPEN_TTL, TD_TIME_SERIES_OPEN_TTL
+from stockbot.config import TD_QUOTE_STALE_MAX, TD_PROFILE_STALE_MAX
+from stockbot.config import TD_PROFILE_TTL, TD_STATISTICS_TTL, TD_DIVIDENDS_TTL, TD_STATEMENT_TTL
+from stockbot.services.api.credits import credit_context, current_context
+from stockbot.services import market_hours
+from stockbot.services.api.tiered_cache import DiskStore, TieredCache
+from stockbot.services.api.batch_quotes import QuoteBatcher
 
-TD_TIME_SERIES_CACHE = TTLCache(maxsize=1_000, ttl=300)
-TD_QUOTE_CACHE = TTLCache(maxsize=2_000, ttl=300)
-TD_PROFILE_CACHE = TTLCache(maxsize=2_000, ttl=600)
+
+def _open_disk_store():
+    if not TD_DISK_CACHE_PATH:
+        return None
+    try:
+        return DiskStore(TD_DISK_CACHE_PATH)
+    except Exception as e:
+        logging.warning(f"TwelveData disk cache disabled ({TD_DISK_CACHE_PATH}): {e}")
+        return None
+
+
+# memory tier in front of one SQLite file that survives restarts
+TD_DISK_STORE = _open_disk_store()
+
+TD_TIME_SERIES_CACHE = TieredCache("time_series", maxsize=1_000, ttl=300,
+                                   disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES)
+TD_QUOTE_CACHE = TieredCache("quote", maxsize=2_000, ttl=300,
+                             disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES,
+                             stale_max=TD_QUOTE_STALE_MAX)
+TD_PROFILE_CACHE = TieredCache("profile", maxsize=2_000, ttl=TD_PROFILE_TTL,
+                               disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES,
+                               stale_max=TD_PROFILE_STALE_MAX)
+TD_STATISTICS_CACHE = TieredCache("statistics", maxsize=2_000, ttl=TD_STATISTICS_TTL,
+                                  disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES)
+TD_DIVIDENDS_CACHE = TieredCache("dividends", maxsize=2_000, ttl=TD_DIVIDENDS_TTL,
+                                 disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES)
+# the whole annual statement per symbol: the year menu and each year's page share it
+TD_INCOME_CACHE = TieredCache("income_statement", maxsize=1_000, ttl=TD_STATEMENT_TTL,
+                              disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES)
+TD_BALANCE_CACHE = TieredCache("balance_sheet", maxsize=1_000, ttl=TD_STATEMENT_TTL,
+                               disk=TD_DISK_STORE, disk_maxsize=TD_DISK_CACHE_MAX_ENTRIES)
+
+_ENDPOINT_CACHES = (TD_PROFILE_CACHE, TD_STATISTICS_CACHE, TD_DIVIDENDS_CACHE, TD_INCOME_CACHE, TD_BALANCE_CACHE)
+
+
+class SingleFlightTimeout(TimeoutError):
+    """The in-flight call this caller was waiting on didn't finish in time."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key: the first caller (the leader) runs
+    fn(), everyone who asks for the same key meanwhile waits up to `timeout`
+    seconds and gets the leader's result, or its exception re-raised.
+    """
+
+    def __init__(self, name: str, timeout: float = TD_SINGLEFLIGHT_TIMEOUT):
+        self.name = name
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "merged": 0, "timeouts": 0, "errors": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["calls"] += 1
+            else:
+                self.stats["merged"] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                with self._lock:
+                    self.stats["errors"] += 1
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(self.timeout):
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise SingleFlightTimeout(f"{self.name}: no result for {key} within {self.timeout}s")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def flight_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
+
+
+_QUOTE_FLIGHT = SingleFlight("quote")
+_TIME_SERIES_FLIGHT = SingleFlight("time_series")
+# cache name -> SingleFlight for the fundamentals endpoints
+_ENDPOINT_FLIGHTS = {cache.name: SingleFlight(cache.name) for cache in _ENDPOINT_CACHES}
+
+# id(td_client) -> QuoteBatcher
+_BATCHERS = {}
+_BATCHERS_LOCK = threading.Lock()
+
+# background refreshes of stale entries; _REVALIDATING holds (cache, key)
+# pairs already queued so a burst of stale hits queues one refresh
+_REVALIDATE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="td-revalidate")
+_REVALIDATING = set()
+_REVALIDATE_LOCK = threading.Lock()
+REVALIDATE_STATS = {"started": 0, "failed": 0}
+
+
+class Cached(NamedTuple):
+    value: object
+    age: Optional[float]  # seconds since fetched when served stale, else None
 
 def _make_key(*args, **kwargs):
     parts = [f"{k}={kwargs[k]}" for k in sorted(kwargs)]
     return "|".join(parts)
 
-@cached(TD_QUOTE_CACHE, key=_make_key)
+def _is_saudi(kwargs) -> bool:
+    return kwargs.get("country") == "Saudi Arabia"
+
+def _read_through(cache: TieredCache, flight: SingleFlight, key, fetch, ttl_for=None) -> Cached:
+    def load():
+        # a leader that finished just before this call began has filled the cache
+        value = cache.peek(key)
+        if value is None:
+            value = fetch()
+            cache.set(key, value, ttl=ttl_for(value) if ttl_for else None)
+        return value
+
+    entry = cache.get_entry(key, allow_stale=True)
+    if entry is None:
+        return Cached(flight.do(key, load), None)
+    if entry.fresh():
+        return Cached(entry.value, None)
+    _revalidate(cache, flight, key, load)
+    return Cached(entry.value, entry.age())
+
+def _revalidate(cache: TieredCache, flight: SingleFlight, key, load) -> None:
+    with _REVALIDATE_LOCK:
+        if (cache.name, key) in _REVALIDATING:
+            return
+        _REVALIDATING.add((cache.name, key))
+        REVALIDATE_STATS["started"] += 1
+    ctx = current_context()
+
+    def refresh():
+        try:
+            with credit_context(*ctx):
+                flight.do(key, load)
+        except Exception as e:
+            with _REVALIDATE_LOCK:
+                REVALIDATE_STATS["failed"] += 1
+            logging.warning(f"Background refresh of {cache.name} {key} failed: {e}")
+        finally:
+            with _REVALIDATE_LOCK:
+                _REVALIDATING.discard((cache.name, key))
+
+    _REVALIDATE_POOL.submit(refresh)
+
+def _quote_ttl(quote, kwargs) -> float:
+    # the quote says whether its market is open; trust that over the schedule
+    exchange = market_hours.exchange_for(_is_saudi(kwargs))
+    return market_hours.cache_ttl(exchange, TD_QUOTE_OPEN_TTL, quote.get("is_market_open"))
+
+def quote_batcher(td_client) -> QuoteBatcher:
+    """The QuoteBatcher collecting /quote requests for this client."""
+    with _BATCHERS_LOCK:
+        batcher = _BATCHERS.get(id(td_client))
+        if batcher is None:
+            batcher = _BATCHERS[id(td_client)] = QuoteBatcher(td_client)
+        return batcher
+
+def td_quote_entry(td_client, **kwargs) -> Cached:
+    """
+    The quote and, when it was served stale while a refresh runs in the
+    background, its age in seconds.
+    """
+    # misses from different users within TD_BATCH_WINDOW_MS share one /quote call
+    return _read_through(
+        TD_QUOTE_CACHE, _QUOTE_FLIGHT, _make_key(**kwargs),
+        lambda: quote_batcher(td_client).get(**kwargs),
+        lambda quote: _quote_ttl(quote, kwargs),
+    )
+
 def td_quote_cached(td_client, **kwargs):
-    return td_client.quote(**kwargs).as_json()
+    return td_quote_entry(td_client, **kwargs).value
+
+def td_quotes_cached(td_client, symbols, **kwargs) -> dict:
+    """
+    {symbol: quote} for many symbols sharing the same kwargs: cached ones
+    from TD_QUOTE_CACHE, the rest in batched /quote calls, each stored under
+    the same per-symbol key td_quote_cached uses. Symbols the API rejected
+    are left out.
+    """
+    quotes, missing = {}, []
+    for sym in dict.fromkeys(symbols):
+        quote = TD_QUOTE_CACHE.get(_make_key(symbol=sym, **kwargs))
+        if quote is None:
+            missing.append(sym)
+        else:
+            quotes[sym] = quote
+    if missing:
+        fetched = quote_batcher(td_client).fetch_many(missing, **kwargs)
+        for sym, quote in fetched.items():
+            if isinstance(quote, Exception):
+                logging.warning(f"Batch quote: {quote}")
+                continue
+            TD_QUOTE_CACHE.set(_make_key(symbol=sym, **kwargs), quote, ttl=_quote_ttl(quote, kwargs))
+            quotes[sym] = quote
+    return quotes
 
-@cached(TD_TIME_SERIES_CACHE, key=_make_key)
 def td_ts_cached(td_client, **kwargs):
-    return td_client.time_series(**kwargs).as_json()
+    exchange = market_hours.exchange_for(_is_saudi(kwargs))
+    return _read_through(
+        TD_TIME_SERIES_CACHE, _TIME_SERIES_FLIGHT, _make_key(**kwargs),
+        lambda: td_client.time_series(**kwargs).as_json(),
+        lambda _: market_hours.cache_ttl(exchange, TD_TIME_SERIES_OPEN_TTL),
+    ).value
+
+def ts_frame(values):
+    """DataFrame like TDClient.time_series(...).as_pandas() from td_ts_cached rows."""
+    import pandas as pd
+    df = pd.DataFrame(list(values))
+    df.index = pd.to_datetime(df.pop("datetime"))
+    df.index.name = "datetime"
+    return df.apply(pd.to_numeric, errors="coerce").astype(float)
+
+def _endpoint_entry(cache: TieredCache, fetch, kwargs) -> Cached:
+    return _read_through(cache, _ENDPOINT_FLIGHTS[cache.name], _make_key(**kwargs), fetch)
+
+def _endpoint_cached(cache: TieredCache, fetch, kwargs):
+    return _endpoint_entry(cache, fetch, kwargs).value
+
+def td_profile_entry(td_client, **kwargs) -> Cached:
+    """
+    The profile and, when it was served stale while a refresh runs in the
+    background, its age in seconds.
+    """
+    return _endpoint_entry(TD_PROFILE_CACHE, lambda: td_client.get_profile(**kwargs).as_json(), kwargs)
+
+def td_profile_cached(td_client, **kwargs):
+    return td_profile_entry(td_client, **kwargs).value
+
+def td_statistics_cached(td_client, **kwargs):
+    return _endpoint_cached(TD_STATISTICS_CACHE, lambda: td_client.get_statistics(**kwargs).as_json(), kwargs)
+
+def td_dividends_cached(td_client, **kwargs):
+    return _endpoint_cached(TD_DIVIDENDS_CACHE, lambda: td_client.get_dividends(**kwargs).as_json(), kwargs)
+
+def td_income_statement_cached(td_client, **kwargs):
+    return _endpoint_cached(TD_INCOME_CACHE, lambda: td_client.get_income_statement(**kwargs).as_json(), kwargs)
+
+def td_balance_sheet_cached(td_client, **kwargs):
+    return _endpoint_cached(TD_BALANCE_CACHE, lambda: td_client.get_balance_sheet(**kwargs).as_json(), kwargs)
+
+def td_cache_stats() -> dict:
+    caches = (TD_QUOTE_CACHE, TD_TIME_SERIES_CACHE) + _ENDPOINT_CACHES
+    return {cache.name: cache.cache_stats() for cache in caches}
+
+def td_flight_stats() -> dict:
+    """Upstream calls made vs. callers merged into an in-flight call, per endpoint."""
+    flights = (_QUOTE_FLIGHT, _TIME_SERIES_FLIGHT) + tuple(_ENDPOINT_FLIGHTS.values())
+    return {flight.name: flight.flight_stats() for flight in flights}
+
+def td_revalidate_stats() -> dict:
+    with _REVALIDATE_LOCK:
+        return dict(REVALIDATE_STATS, pending=len(_REVALIDATING))
+
+def td_batch_stats() -> dict:
+    """/quote calls made vs. symbols they carried, summed over all clients."""
+    with _BATCHERS_LOCK:
+        batchers = list(_BATCHERS.values())
+    calls = symbols = 0
+    for batcher in batchers:
+        stats = batcher.batch_stats()
+        calls += stats["calls"]
+        symbols += stats["symbols"]
+    return {"calls": calls, "symbols": symbols, "symbols_per_call": symbols / calls if calls else 0.0}
@@ -0,0 +1,159 @@
+# stockbot/services/api/credits.py
+"""
+Credit accounting for TwelveData calls.
+
+Every endpoint call made through twelvedata.td_client is charged here
+before it goes out: the cost comes from ENDPOINT_COSTS (per symbol), is
+taken from the shared per-minute budget in services/rate_limiter, and is
+recorded against the feature and user set with credit_context().
+"""
+import functools
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+from stockbot.config import TD_CREDIT_MAX_WAIT
+from stockbot.services.rate_limiter import TWELVEDATA_CREDITS, take
+
+# TDClient method -> credits per symbol, from TwelveData's pricing page
+ENDPOINT_COSTS = {
+    "quote": 1,
+    "price": 1,
+    "time_series": 1,
+    "get_profile": 10,
+    "get_dividends": 20,
+    "get_earnings": 20,
+    "get_statistics": 50,
+    "get_income_statement": 100,
+    "get_balance_sheet": 100,
+    "get_cash_flow": 100,
+}
+
+WINDOW_SECONDS = TWELVEDATA_CREDITS.per_seconds
+
+
+class CreditBudgetExceeded(Exception):
+    """The per-minute credit budget can't pay for a call within its wait limit."""
+
+
+class CreditContext(NamedTuple):
+    feature: str = "unattributed"
+    user: Optional[int] = None
+    # seconds a call may queue for budget; None waits as long as it takes
+    max_wait: Optional[float] = None
+    backend: object = None  # rate_limiter backend, None for the default one
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_window = deque()  # (monotonic, credits) spent in the last WINDOW_SECONDS
+_by_feature = Counter()
+_by_user = Counter()
+CREDIT_STATS = {"calls": 0, "credits": 0, "rejected": 0, "queued": 0, "queued_seconds": 0.0}
+
+
+def current_context() -> CreditContext:
+    return getattr(_local, "context", None) or CreditContext()
+
+
+@contextmanager
+def credit_context(feature: str, user: Optional[int] = None,
+                   max_wait: Optional[float] = None, backend=None):
+    """Attribute the TwelveData calls made in this thread to feature/user."""
+    previous = getattr(_local, "context", None)
+    _local.context = CreditContext(feature, user, max_wait, backend)
+    try:
+        yield _local.context
+    finally:
+        _local.context = previous
+
+
+def handler_credit_context(feature_of):
+    """
+    Decorator for Telegram handlers: runs them in a credit_context for
+    feature_of(update) and the calling user, queueing at most
+    TD_CREDIT_MAX_WAIT seconds so nobody stares at a spinner for a minute.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(update, context, *args, **kwargs):
+            user = update.effective_user.id if update.effective_user else None
+            with credit_context(feature_of(update), user, max_wait=TD_CREDIT_MAX_WAIT):
+                return func(update, context, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def call_cost(endpoint: str, kwargs: dict) -> int:
+    symbols = kwargs.get("symbol")
+    count = len(str(symbols).split(",")) if symbols else 1
+    return ENDPOINT_COSTS.get(endpoint, 1) * count
+
+
+def charge(endpoint: str, credits: int) -> None:
+    """
+    Take `credits` from the shared budget for one call, queueing up to the
+    context's max_wait; raises CreditBudgetExceeded if it can't be paid.
+    """
+    ctx = current_context()
+    if credits > TWELVEDATA_CREDITS.capacity:
+        raise CreditBudgetExceeded(
+            f"{endpoint} costs {credits} credits, more than the {TWELVEDATA_CREDITS.capacity}/min plan"
+        )
+    slept = 0.0
+    while True:
+        allowed, wait = take("twelvedata", "credits", TWELVEDATA_CREDITS, credits, ctx.backend)
+        if allowed:
+            break
+        if ctx.max_wait is not None and slept + wait > ctx.max_wait:
+            with _lock:
+                CREDIT_STATS["rejected"] += 1
+            logging.warning(
+                f"TwelveData budget: rejected {endpoint} ({credits} credits) for "
+                f"{ctx.feature}/{ctx.user}, {wait:.1f}s until it could be paid"
+            )
+            raise CreditBudgetExceeded(f"{endpoint} needs {credits} credits; budget frees up in {wait:.1f}s")
+        logging.info(f"TwelveData budget: {endpoint} for {ctx.feature} queued {wait:.1f}s")
+        time.sleep(wait)
+        slept += wait
+    _record(ctx, credits, slept)
+
+
+def _record(ctx: CreditContext, credits: int, slept: float) -> None:
+    now = time.monotonic()
+    with _lock:
+        _window.append((now, credits))
+        while _window and _window[0][0] <= now - WINDOW_SECONDS:
+            _window.popleft()
+        _by_feature[ctx.feature] += credits
+        if ctx.user is not None:
+            _by_user[ctx.user] += credits
+        CREDIT_STATS["calls"] += 1
+        CREDIT_STATS["credits"] += credits
+        if slept:
+            CREDIT_STATS["queued"] += 1
+            CREDIT_STATS["queued_seconds"] += slept
+
+
+def charged(endpoint: str, method):
+    """Wrap a TDClient endpoint method so each call is charged first."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        charge(endpoint, call_cost(endpoint, kwargs))
+        return method(*args, **kwargs)
+    return wrapper
+
+
+def credit_stats(top: int = 5) -> dict:
+    """This process's spend: last minute, totals by feature, and the top users."""
+    now = time.monotonic()
+    with _lock:
+        window = sum(c for t, c in _window if t > now - WINDOW_SECONDS)
+        return dict(
+            CREDIT_STATS,
+            window=window,
+            by_feature=dict(_by_feature.most_common()),
+            top_users=_by_user.most_common(top),
+        )
@@ -0,0 +1,243 @@
+# stockbot/services/api/tiered_cache.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+_MISSING = object()
+
+
+class Entry(NamedTuple):
+    value: object
+    expires_at: float
+    stored_at: float
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.stored_at
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        return self.expires_at > (time.time() if now is None else now)
+
+
+class DiskStore:
+    """
+    SQLite file shared by every TieredCache (one row per cache/key), so
+    cached API responses survive restarts. Values are stored as JSON.
+    Each cache is trimmed back to its own `maxsize` rows every EVICT_EVERY
+    writes, dropping dead rows and then the least recently read ones.
+    A row is dead once it has expired and is also older than the cache's
+    `stale_max` (0 unless the cache serves stale values).
+    """
+
+    EVICT_EVERY = 100  # writes between size checks
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                cache       TEXT NOT NULL,
+                key         TEXT NOT NULL,
+                value       TEXT NOT NULL,
+                expires_at  REAL NOT NULL,
+                last_access REAL NOT NULL,
+                stored_at   REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (cache, key)
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "stored_at" not in columns:  # files written before stale-while-revalidate
+            self._conn.execute("ALTER TABLE entries ADD COLUMN stored_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (cache, last_access)")
+        self._lock = threading.Lock()
+        self._writes = {}
+
+    def get(self, cache: str, key: str, now: float, stale_max: float = 0) -> Optional[Entry]:
+        """The Entry, or None if absent or dead."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, stored_at FROM entries WHERE cache = ? AND key = ?",
+                (cache, key),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now and row[2] + stale_max <= now:
+                self._conn.execute("DELETE FROM entries WHERE cache = ? AND key = ?", (cache, key))
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE cache = ? AND key = ?",
+                (now, cache, key),
+            )
+        return Entry(json.loads(row[0]), row[1], row[2])
+
+    def set(self, cache: str, key: str, value, expires_at: float, now: float, maxsize: int,
+            stale_max: float = 0) -> None:
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (cache, key, value, expires_at, last_access, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache, key, payload, expires_at, now, now),
+            )
+            self._writes[cache] = self._writes.get(cache, 0) + 1
+            if self._writes[cache] % self.EVICT_EVERY == 0:
+                self._evict(cache, now, maxsize, stale_max)
+
+    def delete(self, cache: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE cache = ? AND key = ?", (cache, key))
+
+    def _evict(self, cache: str, now: float, maxsize: int, stale_max: float) -> None:
+        self._conn.execute(
+            "DELETE FROM entries WHERE cache = ? AND expires_at <= ? AND stored_at + ? <= ?",
+            (cache, now, stale_max, now),
+        )
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries WHERE cache = ?", (cache,)).fetchone()
+        if count > maxsize:
+            self._conn.execute(
+                "DELETE FROM entries WHERE cache = ? AND key IN ("
+                "  SELECT key FROM entries WHERE cache = ? ORDER BY last_access LIMIT ?"
+                ")",
+                (cache, cache, count - maxsize),
+            )
+
+    def size(self, cache: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries WHERE cache = ?", (cache,)).fetchone()[0]
+
+
+class TieredCache:
+    """
+    In-memory LRU with per-entry expiry, backed by an optional DiskStore.
+    A memory miss falls through to disk and promotes the entry, so the first
+    lookups after a restart are served from disk instead of the API.
+
+    With `stale_max` set, expired entries are kept until they are that many
+    seconds old, for get_entry(key, allow_stale=True) to hand out while the
+    caller refreshes them (stale-while-revalidate).
+
+    Keeps the bits of the TTLCache interface the handlers use:
+    get(), [] / `in`, and len().
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float,
+                 disk: Optional[DiskStore] = None, disk_maxsize: Optional[int] = None,
+                 stale_max: float = 0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_max = stale_max
+        self.disk = disk
+        self.disk_maxsize = disk_maxsize or maxsize * 10
+        self._data = OrderedDict()  # key -> Entry, oldest first
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0}
+
+    def _alive(self, item: Entry, now: float) -> bool:
+        return item.expires_at > now or item.stored_at + self.stale_max > now
+
+    def _lookup(self, key, now: float):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if self._alive(item, now):
+                    self._data.move_to_end(key)
+                    return item, "hits"
+                del self._data[key]
+        if self.disk is not None:
+            try:
+                item = self.disk.get(self.name, key, now, self.stale_max)
+            except sqlite3.Error as e:
+                logging.warning(f"{self.name} disk cache read failed: {e}")
+                item = None
+            if item is not None:
+                self._store(key, item)
+                return item, "disk_hits"
+        return None, "misses"
+
+    def _store(self, key, item) -> None:
+        with self._lock:
+            self._data[key] = item
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_entry(self, key, allow_stale: bool = False) -> Optional[Entry]:
+        """
+        The fresh Entry, or None; with allow_stale, also an expired one that
+        is within stale_max. Counts towards the hit ratio.
+        """
+        now = time.time()
+        item, outcome = self._lookup(key, now)
+        if item is not None and not item.fresh(now):
+            if not allow_stale:
+                item, outcome = None, "misses"
+            else:
+                outcome = "stale_hits"
+        with self._lock:
+            self.stats[outcome] += 1
+        return item
+
+    def get(self, key, default=None):
+        item = self.get_entry(key)
+        return item.value if item is not None else default
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._store(key, Entry(value, expires_at, now))
+        if self.disk is not None:
+            try:
+                self.disk.set(self.name, key, value, expires_at, now, self.disk_maxsize, self.stale_max)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logging.warning(f"{self.name} disk cache write failed: {e}")
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self.set(key, value)
+
+    def peek(self, key, default=None):
+        """get() without counting towards the hit ratio."""
+        now = time.time()
+        item = self._lookup(key, now)[0]
+        return item.value if item is not None and item.fresh(now) else default
+
+    def __contains__(self, key) -> bool:
+        return self.peek(key, _MISSING) is not _MISSING
+
+    def __delitem__(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+        if self.disk is not None:
+            self.disk.delete(self.name, key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def cache_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            size = len(self._data)
+        hits = stats["hits"] + stats["disk_hits"] + stats["stale_hits"]
+        total = hits + stats["misses"]
+        return {
+            "hits": hits,
+            "disk_hits": stats["disk_hits"],
+            "stale_hits": stats["stale_hits"],
+            "misses": stats["misses"],
+            "hit_ratio": hits / total if total else 0.0,
+            "size": size,
+        }
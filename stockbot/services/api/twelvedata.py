@@ -1,9 +1,43 @@
 
 import os
-from twelvedata import TDClient
+import threading
 from stockbot.config import TWELVEDATA_API_KEY
+from stockbot.services.api.credits import ENDPOINT_COSTS, charged
 
-td_client = TDClient(apikey=TWELVEDATA_API_KEY)
+
+class _LazyTDClient:
+    """
+    Stands in for TDClient and builds it on first attribute access, so the
+    twelvedata import (and pkg_resources behind it) is paid by the first
+    API call rather than by bot startup.
+
+    Endpoint methods come back wrapped by credits.charged(), so every call
+    is paid for out of the shared credit budget. The charge happens when the
+    request is built (td_client.quote(...)), just before .as_json() /
+    .as_pandas() sends it.
+    """
+
+    def __init__(self, apikey):
+        self._apikey = apikey
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from twelvedata import TDClient
+                    self._client = TDClient(apikey=self._apikey)
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._get_client(), name)
+        if name in ENDPOINT_COSTS:
+            return charged(name, attr)
+        return attr
+
+
+td_client = _LazyTDClient(TWELVEDATA_API_KEY)
 
 def td_kwargs(is_saudi: bool):
     """Return {'country':'Saudi Arabia'} when needed."""
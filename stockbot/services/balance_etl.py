@@ -6,7 +6,7 @@ import yfinance as yf
 from psycopg2.extras import execute_values
 
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.data import COMPANIES
+from stockbot.data import get_companies
 
 
 # ─── Selected Balance Sheet Metrics ────────────────────────────────────────────
@@ -122,7 +122,7 @@ def insert_balance_sheets(rows):
     ;
     """
 
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     try:
         with conn.cursor() as cur:
             execute_values(cur, sql, deduped_rows)
@@ -136,7 +136,7 @@ def refresh_balance_test():
     Fetch & upsert balance_sheets on demand.
     Returns the number of rows processed.
     """
-    rows = get_balance_sheets(COMPANIES)
+    rows = get_balance_sheets(get_companies())
     if not rows:
         return 0
     insert_balance_sheets(rows)
@@ -6,7 +6,7 @@ import yfinance as yf
 from psycopg2.extras import execute_values
 
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.data import COMPANIES
+from stockbot.data import get_companies
 
 # ─── Per-symbol fetch to enable parallel execution ──────────────────────────────
 def fetch_cashflows_for_symbol(sym):
@@ -88,7 +88,7 @@ def insert_cashflows(rows):
         updated_date                  = EXCLUDED.updated_date;
     """
 
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     try:
         with conn.cursor() as cur:
             execute_values(cur, sql, deduped_rows)
@@ -101,7 +101,7 @@ def refresh_cashflow_test():
     Fetch & upsert cash_flows on demand.
     Returns the number of rows processed.
     """
-    rows = get_cashflows(COMPANIES)
+    rows = get_cashflows(get_companies())
     if not rows:
         return 0
     insert_cashflows(rows)
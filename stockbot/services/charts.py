@@ -0,0 +1,381 @@
+# stockbot/services/charts.py
+"""
+Candlestick PNGs for the history charts.
+
+Rendering runs in a small pool of worker processes that are started (and
+have their plotting library imported) once, so a chart costs one render
+rather than an interpreter, a matplotlib import or a kaleido start-up, and
+a stuck render can't hold a bot thread past CHART_RENDER_TIMEOUT. Workers
+run this module with --serve and load nothing else from the bot.
+
+Backends:
+  - "matplotlib": Agg raster output, the default; no browser process behind it
+  - "plotly":     the old plotly + kaleido figure, higher fidelity; kaleido's
+                  headless Chromium roughly doubles the cold start
+
+    python -m stockbot.services.charts           # benchmark the backends
+    python -m stockbot.services.charts --serve   # a worker (started by the pool)
+"""
+import logging
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from io import BytesIO
+from typing import List, NamedTuple
+from stockbot.config import CHART_BACKEND, CHART_PROCESSES, CHART_RENDER_TIMEOUT
+
+WIDTH, HEIGHT = 960, 480
+
+
+class Candles(NamedTuple):
+    """Oldest bar first; plain lists so they pickle cheaply to the workers."""
+    labels: List[str]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+
+
+class ChartTimeout(TimeoutError):
+    """A render didn't finish within CHART_RENDER_TIMEOUT."""
+
+
+class ChartError(RuntimeError):
+    """A chart worker failed the render or exited."""
+
+
+def candles_from_frame(df) -> Candles:
+    """Candles from a time_series DataFrame (any order, 'datetime' label column)."""
+    df = df.sort_index()
+    return Candles(
+        list(df["datetime"]),
+        [float(v) for v in df["open"]],
+        [float(v) for v in df["high"]],
+        [float(v) for v in df["low"]],
+        [float(v) for v in df["close"]],
+    )
+
+
+# ─── Backends (run inside the workers) ─────────────────────────────────────
+
+def _render_matplotlib(candles: Candles, title: str) -> bytes:
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(WIDTH / 100, HEIGHT / 100), dpi=100)
+    FigureCanvasAgg(fig)
+    # fixed margins: tight_layout() would cost as much as the drawing itself
+    fig.subplots_adjust(left=0.07, right=0.98, top=0.92, bottom=0.18)
+    ax = fig.add_subplot()
+    n = len(candles.close)
+    x = range(n)
+    colors = ["#26a69a" if c >= o else "#ef5350" for o, c in zip(candles.open, candles.close)]
+
+    # wicks and bodies as two line collections rather than one patch per bar
+    body_points = max(1.0, 0.6 * WIDTH * 0.91 / max(n, 1) * 72 / 100)
+    ax.vlines(x, candles.low, candles.high, colors=colors, linewidth=1)
+    ax.vlines(
+        x,
+        [min(o, c) for o, c in zip(candles.open, candles.close)],
+        [max(o, c) for o, c in zip(candles.open, candles.close)],
+        colors=colors, linewidth=body_points,
+    )
+    ax.plot(x, candles.close, linewidth=1.5, color="#636efa", label="Close")
+
+    step = max(1, n // 8)
+    ticks = list(x)[::step]
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([candles.labels[i] for i in ticks], rotation=30, ha="right", fontsize=8)
+    ax.set_xlim(-1, n)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    ax.legend(loc="upper left")
+
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def _render_plotly(candles: Candles, title: str) -> bytes:
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(
+        x=candles.labels,
+        open=candles.open, high=candles.high, low=candles.low, close=candles.close,
+        name="OHLC"
+    ))
+    fig.add_trace(go.Scatter(
+        x=candles.labels, y=candles.close,
+        mode='lines', line=dict(width=1.5), name="Close"
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_rangeslider_visible=False,
+        template="plotly_white",
+        width=WIDTH, height=HEIGHT
+    )
+    return fig.to_image(format="png")
+
+
+RENDERERS = {
+    "matplotlib": _render_matplotlib,
+    "plotly": _render_plotly,
+}
+
+
+def _render(backend: str, candles: Candles, title: str) -> bytes:
+    return RENDERERS[backend](candles, title)
+
+
+# ─── Worker pool ────────────────────────────────────────────────────────────
+#
+# A worker is `python -m stockbot.services.charts --serve`: it imports this
+# module and its plotting library and nothing else, so starting one never
+# loads the bot (telegram, the handlers, the DB pools). Requests and replies
+# are pickled over its stdin/stdout, one render at a time.
+
+_SERVE = ["-m", "stockbot.services.charts", "--serve"]
+# the directory holding the stockbot package, for bots started from elsewhere
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_WARM_UP = Candles(["a", "b"], [1.0, 2.0], [2.0, 3.0], [0.5, 1.5], [2.0, 1.5])
+
+
+class _Worker:
+    def __init__(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_ROOT, env.get("PYTHONPATH")]))
+        self.proc = subprocess.Popen([sys.executable, *_SERVE], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, env=env)
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, name="chart-worker", daemon=True).start()
+
+    def _read_replies(self) -> None:
+        try:
+            while True:
+                self._replies.put(pickle.load(self.proc.stdout))
+        except Exception as e:  # EOFError once the worker exits
+            self._replies.put(("error", f"chart worker exited: {e!r}"))
+        finally:
+            self.proc.stdout.close()
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def send(self, backend: str, candles: Candles, title: str) -> None:
+        try:
+            pickle.dump((backend, tuple(candles), title), self.proc.stdin)
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise ChartError(f"chart worker exited: {e!r}")
+
+    def receive(self, backend: str, timeout: float) -> bytes:
+        try:
+            status, value = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            # its reply would answer the next request, so this worker is done
+            self.kill()
+            raise ChartTimeout(f"{backend} chart not rendered within {timeout:.1f}s")
+        if status != "ok":
+            raise ChartError(value)
+        return value
+
+    def render(self, backend: str, candles: Candles, title: str, timeout: float) -> bytes:
+        self.send(backend, candles, title)
+        return self.receive(backend, timeout)
+
+    def kill(self) -> None:
+        self.proc.kill()
+        self.proc.wait()
+        self.proc.stdin.close()
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        self.proc.wait()
+
+
+def _serve() -> None:
+    """Worker loop: render requests from stdin until the bot closes it."""
+    replies = sys.stdout.buffer
+    sys.stdout = sys.stderr  # keep stray prints off the reply pipe
+    requests = sys.stdin.buffer
+    while True:
+        try:
+            backend, fields, title = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            reply = ("ok", _render(backend, Candles(*fields), title))
+        except Exception as e:
+            # as text: unpickling the exception could import the library in the bot
+            reply = ("error", f"{type(e).__name__}: {e}")
+        pickle.dump(reply, replies)
+        replies.flush()
+
+
+# One slot per worker: the idle _Worker, or None for one not started yet.
+# A render takes a slot, so a stuck worker only ever holds up its own caller.
+_IDLE = queue.Queue()
+for _ in range(CHART_PROCESSES):
+    _IDLE.put(None)
+_STATS_LOCK = threading.Lock()
+CHART_STATS = {"renders": 0, "timeouts": 0, "errors": 0, "started": 0, "render_ms": 0.0}
+
+
+def _checkout(timeout: float) -> _Worker:
+    """An idle worker, (re)started if needed; ChartTimeout if none frees up in time."""
+    try:
+        worker = _IDLE.get(timeout=timeout)
+    except queue.Empty:
+        raise ChartTimeout(f"no chart worker free within {timeout:.1f}s")
+    if worker is not None and worker.alive():
+        return worker
+    try:
+        worker = _Worker()
+    except Exception:
+        _IDLE.put(None)
+        raise
+    with _STATS_LOCK:
+        CHART_STATS["started"] += 1
+    return worker
+
+
+def warm_chart_pool(backend: str = CHART_BACKEND) -> None:
+    """Start the workers and load `backend` in each; called once at startup."""
+    if CHART_PROCESSES <= 0:
+        return
+    workers = []
+    try:
+        for _ in range(CHART_PROCESSES):
+            workers.append(_checkout(60))
+        # all of them load the library at once
+        for worker in workers:
+            worker.send(backend, _WARM_UP, "warm-up")
+        for worker in workers:
+            worker.receive(backend, 60)
+        logging.info(f"📊 Chart pool ready: {CHART_PROCESSES} {backend} workers")
+    except Exception as e:
+        logging.warning(f"Chart pool warm-up failed, will retry on first chart: {e}")
+        # some may still owe a warm-up reply; they're restarted on first use
+        for worker in workers:
+            worker.kill()
+    finally:
+        for worker in workers:
+            _IDLE.put(worker)
+
+
+def render_candles(candles: Candles, title: str, backend: str = CHART_BACKEND,
+                   timeout: float = CHART_RENDER_TIMEOUT) -> bytes:
+    """
+    PNG bytes for `candles`. Raises ChartTimeout if no worker frees up or the
+    render overruns (only that render's worker is killed), ChartError if the
+    render failed.
+    """
+    if backend not in RENDERERS:
+        raise ValueError(f"Unknown chart backend {backend!r}; expected one of {sorted(RENDERERS)}")
+    started = time.perf_counter()
+    try:
+        if CHART_PROCESSES <= 0:
+            png = _render(backend, candles, title)
+        else:
+            worker = _checkout(timeout)
+            try:
+                png = worker.render(backend, candles, title,
+                                    max(0.0, timeout - (time.perf_counter() - started)))
+            finally:
+                _IDLE.put(worker)
+    except ChartTimeout:
+        with _STATS_LOCK:
+            CHART_STATS["timeouts"] += 1
+        raise
+    except Exception:
+        with _STATS_LOCK:
+            CHART_STATS["errors"] += 1
+        raise
+    with _STATS_LOCK:
+        CHART_STATS["renders"] += 1
+        CHART_STATS["render_ms"] += (time.perf_counter() - started) * 1000
+    return png
+
+
+def chart_stats() -> dict:
+    with _STATS_LOCK:
+        stats = dict(CHART_STATS)
+    stats["render_ms_avg"] = stats["render_ms"] / stats["renders"] if stats["renders"] else 0.0
+    return stats
+
+
+# ─── Benchmark ──────────────────────────────────────────────────────────────
+
+def _sample_candles(n: int = 210) -> Candles:
+    import random
+    rnd = random.Random(0)
+    price, rows = 100.0, []
+    for i in range(n):
+        o = price
+        c = o * (1 + rnd.gauss(0, 0.01))
+        rows.append((f"2025-01-{1 + i // 7:02d} {10 + i % 7:02d}:00", o,
+                     max(o, c) * (1 + abs(rnd.gauss(0, 0.003))),
+                     min(o, c) * (1 - abs(rnd.gauss(0, 0.003))), c))
+        price = c
+    return Candles(*(list(col) for col in zip(*rows)))
+
+
+def benchmark(backends=None, runs: int = 10, bars: int = 210) -> dict:
+    """
+    Per backend, in this process: the cold first render (library import
+    included) and the median warm render; then the median round trip
+    through a warm worker pool. Backends that aren't installed are skipped.
+    """
+    from statistics import median
+    candles = _sample_candles(bars)
+    results = {}
+    for backend in backends or list(RENDERERS):
+        try:
+            started = time.perf_counter()
+            _render(backend, candles, "benchmark")
+            cold = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            results[backend] = {"error": str(e)}
+            continue
+        warm = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            size = len(_render(backend, candles, "benchmark"))
+            warm.append((time.perf_counter() - started) * 1000)
+
+        pooled = []
+        worker = _Worker()
+        try:
+            worker.render(backend, _WARM_UP, "warm-up", 60)
+            for _ in range(runs):
+                started = time.perf_counter()
+                worker.render(backend, candles, "benchmark", 60)
+                pooled.append((time.perf_counter() - started) * 1000)
+        finally:
+            worker.close()
+
+        results[backend] = {
+            "cold_ms": cold,
+            "warm_ms": median(warm),
+            "pool_ms": median(pooled),
+            "png_bytes": size,
+        }
+    return results
+
+
+if __name__ == "__main__" and sys.argv[1:] == ["--serve"]:
+    _serve()
+elif __name__ == "__main__":
+    for name, result in benchmark().items():
+        if "error" in result:
+            print(f"{name:<11} skipped: {result['error']}")
+            continue
+        print(
+            f"{name:<11} cold {result['cold_ms']:8.1f} ms   warm {result['warm_ms']:7.1f} ms   "
+            f"pool {result['pool_ms']:7.1f} ms   {result['png_bytes'] // 1024} KiB"
+        )
@@ -1,10 +1,7 @@
 # stockbot/services/daily_closes_etl.py
 import os
 import logging
-import time
-import threading
 from datetime import date, datetime, timedelta
-from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
@@ -12,8 +9,12 @@ import pytz
 
 from psycopg2.extras import execute_values
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.data import COMPANIES
+from stockbot.data import get_companies
 from stockbot.services.api.twelvedata import td_client, td_kwargs
+from stockbot.services.api.cache import td_quotes_cached
+from stockbot.services.api.credits import credit_context
+from stockbot.services.rate_limiter import make_backend
+from stockbot.config import RATE_LIMIT_BACKEND
 
 import warnings
 
@@ -24,42 +25,37 @@ warnings.filterwarnings("ignore", category=FutureWarning, module="twelvedata.mix
 # Date range (defaults to today)
 START_DATE_STR = os.getenv("START_DATE")
 END_DATE_STR   = os.getenv("END_DATE")
-if START_DATE_STR and END_DATE_STR:
-    START_DATE = datetime.strptime(START_DATE_STR, "%Y-%m-%d").date()
-    END_DATE   = datetime.strptime(END_DATE_STR,   "%Y-%m-%d").date()
-else:
-    START_DATE = END_DATE = date.today()
-
-# build date list
-_date_list = []
-_current = START_DATE
-while _current <= END_DATE:
-    _date_list.append(_current)
-    _current += timedelta(days=1)
+
+def _date_list() -> list:
+    """Dates for one run, built per run: a scheduled run in a long-lived bot covers that day."""
+    if START_DATE_STR and END_DATE_STR:
+        current = datetime.strptime(START_DATE_STR, "%Y-%m-%d").date()
+        end     = datetime.strptime(END_DATE_STR,   "%Y-%m-%d").date()
+    else:
+        current = end = date.today()
+    dates = []
+    while current <= end:
+        dates.append(current)
+        current += timedelta(days=1)
+    return dates
 
 # ─────────── Rate limiter ───────────
-RATE_LIMIT = 600
-PERIOD     = 60
-_times     = deque()
-_lock      = threading.Lock()
-
-def throttle():
-    with _lock:
-        now = time.time()
-        while _times and now - _times[0] > PERIOD:
-            _times.popleft()
-        if len(_times) >= RATE_LIMIT:
-            sleep_secs = PERIOD - (now - _times[0])
-            logging.info(f"Rate limit hit, sleeping {sleep_secs:.1f}s")
-            time.sleep(sleep_secs)
-            now = time.time()
-            while _times and now - _times[0] > PERIOD:
-                _times.popleft()
-        _times.append(now)
+# td_client charges every call against the per-minute TwelveData budget
+# (services/api/credits); with RATE_LIMIT_BACKEND=postgres that budget is
+# shared with every other process, via connections from the batch pool.
+# The ETL waits for credits rather than failing.
+_BACKEND = make_backend(partition="batch") if RATE_LIMIT_BACKEND == "postgres" else None
+
+def _credits():
+    return credit_context("daily_closes", backend=_BACKEND)
 
 # ─────────── Fetch & upsert logic ───────────
 def fetch_symbol_data(sym: str, target: date) -> dict:
-    throttle()
+    with _credits():
+        return _fetch_symbol_data(sym, target)
+
+
+def _fetch_symbol_data(sym: str, target: date) -> dict:
     # handle Saudi tickers by stripping .SR and marking is_saudi
     is_saudi = sym.upper().endswith(".SR")
     api_symbol = sym.split('.', 1)[0] if is_saudi else sym
@@ -94,18 +90,53 @@ def fetch_symbol_data(sym: str, target: date) -> dict:
     }
 
 
+def fetch_quotes(symbols, target: date) -> dict:
+    """
+    {symbol: row dict} for `target` from batched /quote calls (one per
+    TD_BATCH_MAX_SYMBOLS symbols and market). A quote only describes the
+    latest session, so symbols whose quote is for another day, or whose
+    market is still open, are left out for fetch_symbol_data to handle.
+    """
+    by_market = {}
+    for sym in symbols:
+        is_saudi = sym.upper().endswith(".SR")
+        api_symbol = sym.split('.', 1)[0] if is_saudi else sym
+        by_market.setdefault(is_saudi, {})[api_symbol] = sym
+
+    rows = {}
+    for is_saudi, api_symbols in by_market.items():
+        try:
+            with _credits():
+                quotes = td_quotes_cached(td_client, list(api_symbols), **td_kwargs(is_saudi))
+        except Exception as e:
+            logging.error(f"Batch quote ({'saudi' if is_saudi else 'other'}) failed: {e}")
+            continue
+        for api_symbol, q in quotes.items():
+            sym = api_symbols[api_symbol]
+            try:
+                if q.get('is_market_open') or str(q.get('datetime', ''))[:10] != target.isoformat():
+                    continue
+                rows[sym] = {
+                    'symbol':      sym,
+                    'trade_date':  target,
+                    'open_price':  float(q['open']),
+                    'high_price':  float(q['high']),
+                    'low_price':   float(q['low']),
+                    'close_price': float(q['close']),
+                    'volume':      int(float(q['volume'])) if q.get('volume') not in (None, '') else None
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"{sym}: unusable quote ({e}), falling back to time_series")
+    return rows
+
+
 def get_tickers():
-    conn = get_db_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT symbol FROM tickers_ar_en ORDER BY symbol")
-            return [r[0] for r in cur.fetchall()]
-    finally:
-        put_db_conn(conn)
+    # same snapshot the bot and the other ETLs see; refreshed by the universe reloader
+    return list(get_companies())
 
 
 def get_existing(target: date):
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     try:
         with conn.cursor() as cur:
             cur.execute(
@@ -130,7 +161,7 @@ def insert_daily_closes(rows):
         close_price  = EXCLUDED.close_price,
         volume       = EXCLUDED.volume;
     """
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     try:
         with conn.cursor() as cur:
             execute_values(cur, sql, rows)
@@ -146,14 +177,29 @@ def refresh_daily_closes():
     """ETL entry point: fetch & upsert daily_closes for configured dates."""
     total = 0
     all_syms = get_tickers()
+    today = date.today()
 
-    for target_date in _date_list:
+    for target_date in _date_list():
         logging.info(f"Processing date {target_date}")
         missing = set(all_syms) - get_existing(target_date)
         if not missing:
             continue
 
         rows = []
+        if target_date == today:
+            # today's bar comes from the latest quote: one call per batch of symbols
+            for data in fetch_quotes(sorted(missing), target_date).values():
+                rows.append((
+                    data['symbol'],
+                    data['trade_date'],
+                    data['open_price'],
+                    data['high_price'],
+                    data['low_price'],
+                    data['close_price'],
+                    data['volume'],
+                ))
+            missing -= {r[0] for r in rows}
+
         with ThreadPoolExecutor(max_workers=8) as exe:
             futures = {exe.submit(fetch_symbol_data, s, target_date): s for s in missing}
             for fut in as_completed(futures):
@@ -7,7 +7,7 @@ import yfinance as yf
 from psycopg2.extras import execute_values
 
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.data import COMPANIES
+from stockbot.data import get_companies
 
 # ─── Fetch dividends for one symbol ────────────────────────────────
 def fetch_dividends_for_symbol(symbol):
@@ -74,7 +74,7 @@ def insert_dividends(rows):
         updated_date = EXCLUDED.updated_date;
     """
 
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     try:
         with conn.cursor() as cur:
             execute_values(cur, sql, list(unique))
@@ -91,7 +91,7 @@ def refresh_dividends_test():
     Fetch & upsert dividends on demand.
     Returns the number of rows processed.
     """
-    rows = get_dividends(COMPANIES)
+    rows = get_dividends(get_companies())
     if not rows:
         return 0
     insert_dividends(rows)
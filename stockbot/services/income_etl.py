@@ -6,7 +6,7 @@ import yfinance as yf
 from psycopg2.extras import execute_values
 
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.data import COMPANIES
+from stockbot.data import get_companies
 
 # ─── Selected Income Statement Metrics ─────────────────────────────────────────
 METRIC_KEYS = [
@@ -130,7 +130,7 @@ def insert_income_statements(rows):
     ;
     """
 
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     try:
         with conn.cursor() as cur:
             execute_values(cur, sql, deduped_rows)
@@ -143,7 +143,7 @@ def refresh_income_test():
     Fetch & upsert income_statements on demand.
     Returns the number of rows processed.
     """
-    rows = get_income_statements(COMPANIES)
+    rows = get_income_statements(get_companies())
     if not rows:
         return 0
     insert_income_statements(rows)
@@ -0,0 +1,72 @@
+# stockbot/services/market_hours.py
+from datetime import datetime, time, timedelta
+from typing import NamedTuple, Optional
+import pytz
+from stockbot.config import TD_CLOSED_TTL_MAX, TD_HOLIDAY_TTL
+
+
+class Session(NamedTuple):
+    tz: str
+    weekdays: frozenset  # datetime.weekday(): Monday=0 … Sunday=6
+    open: time
+    close: time
+
+
+# Regular sessions only: no holidays, half days or auctions
+SESSIONS = {
+    "tadawul": Session("Asia/Riyadh", frozenset({6, 0, 1, 2, 3}), time(10, 0), time(15, 0)),
+    "us": Session("America/New_York", frozenset({0, 1, 2, 3, 4}), time(9, 30), time(16, 0)),
+}
+
+
+def exchange_for(is_saudi: bool) -> str:
+    return "tadawul" if is_saudi else "us"
+
+
+def _local_now(session: Session, now: Optional[datetime]) -> datetime:
+    tz = pytz.timezone(session.tz)
+    if now is None:
+        return datetime.now(tz)
+    return now.astimezone(tz) if now.tzinfo else pytz.utc.localize(now).astimezone(tz)
+
+
+def is_open(exchange: str, now: Optional[datetime] = None) -> bool:
+    session = SESSIONS[exchange]
+    local = _local_now(session, now)
+    return local.weekday() in session.weekdays and session.open <= local.time() < session.close
+
+
+def next_open(exchange: str, now: Optional[datetime] = None) -> datetime:
+    """The next session open strictly after `now`, as an aware datetime."""
+    session = SESSIONS[exchange]
+    local = _local_now(session, now)
+    tz = pytz.timezone(session.tz)
+    for days in range(8):
+        day = local.date() + timedelta(days=days)
+        if day.weekday() not in session.weekdays:
+            continue
+        candidate = tz.localize(datetime.combine(day, session.open))
+        if candidate > local:
+            return candidate
+    raise ValueError(f"{exchange} has no trading days")
+
+
+def cache_ttl(exchange: str, open_ttl: float, market_open: Optional[bool] = None,
+              now: Optional[datetime] = None) -> float:
+    """
+    How long a price for `exchange` stays fresh: `open_ttl` during the
+    session, otherwise until the next open (capped at TD_CLOSED_TTL_MAX).
+    `market_open` is the API's own is_market_open flag when there is one;
+    it wins over the schedule, and a market that says it's closed during
+    session hours (a holiday) is rechecked after TD_HOLIDAY_TTL.
+    """
+    scheduled = is_open(exchange, now)
+    if market_open is None:
+        market_open = scheduled
+    if market_open:
+        return open_ttl
+    if scheduled:
+        return max(open_ttl, TD_HOLIDAY_TTL)
+    local = _local_now(SESSIONS[exchange], now)
+    until_open = (next_open(exchange, now) - local).total_seconds()
+    return max(open_ttl, min(until_open, TD_CLOSED_TTL_MAX))
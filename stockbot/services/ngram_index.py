@@ -0,0 +1,224 @@
+# stockbot/services/ngram_index.py
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+
+import numpy as np
+from rapidfuzz import process, fuzz
+
+from stockbot.config import (
+    TICKER_SEARCH_PREFILTER_MIN_CHOICES,
+    TICKER_SEARCH_CANDIDATES,
+    TICKER_SEARCH_LATENCY_TARGET_MS,
+)
+
+NGRAM_SIZE = 3
+# grams found in more than this share of names (e.g. " ال", "ية ") carry almost
+# no signal and have huge posting lists, so they are skipped when counting.
+COMMON_GRAM_RATIO = 0.1
+# candidates whose WRatio bound is within this of the k-th score are still scored,
+# so float rounding in the bound or in rapidfuzz's score_cutoff never drops a tie
+_SLACK = 1e-3
+_BATCH = 2048
+
+
+def ngrams(txt: str, n: int = NGRAM_SIZE) -> set:
+    """Character n-grams of an already-normalized name, padded at word edges."""
+    padded = f" {txt} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    """
+    Inverted index from character n-grams to positions in `choices`, plus
+    the per-name character counts and word postings extract() uses to bound
+    WRatio. Works on any script, so the same class serves Arabic and Latin names.
+    """
+
+    def __init__(self, choices, n: int = NGRAM_SIZE):
+        self.choices = tuple(choices)
+        self.n = n
+        postings = defaultdict(list)
+        for pos, choice in enumerate(self.choices):
+            for gram in ngrams(choice, n):
+                postings[gram].append(pos)
+        self.postings = {gram: tuple(ids) for gram, ids in postings.items()}
+        self.common_limit = max(1, int(len(self.choices) * COMMON_GRAM_RATIO))
+        if len(self.choices) >= TICKER_SEARCH_PREFILTER_MIN_CHOICES:
+            self._build_bounds()
+
+    def __len__(self):
+        return len(self.choices)
+
+    def _build_bounds(self) -> None:
+        self.lengths = np.array([len(c) for c in self.choices], dtype=np.float64)
+        codes = np.frombuffer("".join(self.choices).encode("utf-32-le"), dtype=np.uint32)
+        alphabet, columns = np.unique(codes, return_inverse=True)
+        rows = np.repeat(np.arange(len(self.choices)), self.lengths.astype(np.int64))
+        counts = np.bincount(rows * len(alphabet) + columns, minlength=len(self.choices) * len(alphabet))
+        # column-major: a query reads one column per distinct character
+        self.char_counts = np.asfortranarray(
+            counts.reshape(len(self.choices), len(alphabet)).astype(np.uint16))
+        self.char_columns = {chr(code): col for col, code in enumerate(alphabet)}
+
+        words = defaultdict(list)
+        self.repeated_words = np.zeros(len(self.choices), dtype=bool)
+        for pos, choice in enumerate(self.choices):
+            tokens = choice.split()
+            self.repeated_words[pos] = len(set(tokens)) < len(tokens)
+            for token in set(tokens):
+                words[token].append(pos)
+        self.word_postings = {token: np.array(ids) for token, ids in words.items()}
+
+    def _candidate_positions(self, query: str, limit: int) -> list:
+        lists = [self.postings[g] for g in ngrams(query, self.n) if g in self.postings]
+        selective = [ids for ids in lists if len(ids) <= self.common_limit]
+        counts = Counter(chain.from_iterable(selective or lists))
+        if len(counts) <= limit:
+            return sorted(counts)
+        return sorted(pos for pos, _ in counts.most_common(limit))
+
+    def candidates(self, query: str, limit: int = TICKER_SEARCH_CANDIDATES) -> tuple:
+        """
+        Return the choices sharing the most n-grams with `query`, in their
+        original order. Small universes are returned whole: a full scan there
+        is cheaper than counting postings.
+        """
+        if len(self.choices) < TICKER_SEARCH_PREFILTER_MIN_CHOICES:
+            return self.choices
+        return tuple(self.choices[pos] for pos in self._candidate_positions(query, limit))
+
+    def upper_bounds(self, query: str) -> np.ndarray:
+        """
+        An upper bound on fuzz.WRatio(query, choice) for every choice, from
+        the characters they share: no alignment (ratio, partial_ratio or the
+        token variants) can match more characters than the two have in common.
+        Choices sharing a whole word with the query, or repeating one of their
+        own, can reach 100 through the token-set ratios and are bounded at 100.
+        """
+        shared = np.zeros(len(self.choices))
+        for char, count in Counter(query).items():
+            col = self.char_columns.get(char)
+            if col is not None:
+                shared += np.minimum(self.char_counts[:, col], count)
+
+        lq, lc = len(query), self.lengths
+        shorter = np.minimum(lc, lq)
+        len_ratio = np.maximum(lc, lq) / np.maximum(shorter, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = 2 * shared / (lq + lc)
+            # a window of the longer string vs the shorter one, edge windows included
+            partial = np.where(len_ratio < 8, 0.9, 0.6) * np.nan_to_num(2 * shared / (shorter + shared))
+        bounds = np.where(len_ratio < 1.5, ratio, np.maximum(ratio, partial)) * 100
+        bounds[self.repeated_words] = 100
+        for token in set(query.split()):
+            if token in self.word_postings:
+                bounds[self.word_postings[token]] = 100
+        return bounds
+
+    def extract(self, query: str, limit: int = 5, score_cutoff: float = 0) -> list:
+        """
+        The same (choice, score, position) list as
+        process.extract(query, choices, scorer=fuzz.WRatio, ...), best first.
+
+        The n-gram candidates are scored first to get a k-th best score; after
+        that only choices whose upper_bounds() can still reach it are scored,
+        best bound first, until none can.
+        """
+        words = query.split()
+        if len(self.choices) < TICKER_SEARCH_PREFILTER_MIN_CHOICES or len(set(words)) < len(words):
+            # small universe, or a repeated word the bound doesn't cover
+            return process.extract(query, self.choices, scorer=fuzz.WRatio,
+                                   limit=limit, score_cutoff=score_cutoff)
+
+        def score(positions, cutoff):
+            found = process.extract(query, [self.choices[p] for p in positions],
+                                    scorer=fuzz.WRatio, limit=limit, score_cutoff=cutoff)
+            return [(choice, sc, int(positions[i])) for choice, sc, i in found]
+
+        def kth():
+            return best[limit - 1][1] if len(best) >= limit else score_cutoff
+
+        seeds = self._candidate_positions(query, TICKER_SEARCH_CANDIDATES)
+        best = score(seeds, score_cutoff)
+        bounds = self.upper_bounds(query)
+        bounds[seeds] = -1
+        rest = np.flatnonzero(bounds >= kth() - _SLACK)
+        rest = rest[np.argsort(-bounds[rest], kind="stable")]
+        for start in range(0, len(rest), _BATCH):
+            batch = rest[start:start + _BATCH]
+            if bounds[batch[0]] < kth() - _SLACK:
+                break
+            # ties rank by position, as in a scan over all choices
+            found = score(np.sort(batch), max(score_cutoff, kth() - _SLACK))
+            best = sorted(best + found, key=lambda m: (-m[1], m[2]))[:limit]
+        return best
+
+
+def _random_name(rng, alphabet, words):
+    return " ".join(
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(4, 10)))
+        for _ in range(words)
+    )
+
+
+def benchmark(universe: int = 100_000, queries: int = 200, seed: int = 7,
+              min_score: float = 60) -> dict:
+    """
+    Time NgramIndex.extract against exhaustive WRatio scoring on a synthetic
+    universe of Latin and Arabic names, and report top-1 and top-5 parity
+    (same names and scores, in the same order) at the bot's min_score.
+    """
+    rng = random.Random(seed)
+    latin = "abcdefghijklmnopqrstuvwxyz"
+    arabic = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+    names = {
+        _random_name(rng, latin if i % 2 else arabic, rng.randint(1, 4))
+        for i in range(universe)
+    }
+    started = time.perf_counter()
+    index = NgramIndex(sorted(names))
+    build_ms = (time.perf_counter() - started) * 1000
+
+    samples = rng.sample(index.choices, queries)
+    # drop a character so the query is a near match rather than an exact one
+    probes = [s[:len(s) // 2] + s[len(s) // 2 + 1:] for s in samples]
+
+    timings, full_timings, top1, topk = [], [], 0, 0
+    for q in probes:
+        started = time.perf_counter()
+        fast = index.extract(q, limit=5, score_cutoff=min_score)
+        timings.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        full = process.extract(q, index.choices, scorer=fuzz.WRatio, limit=5, score_cutoff=min_score)
+        full_timings.append((time.perf_counter() - started) * 1000)
+        fast, full = [m[:2] for m in fast], [m[:2] for m in full]
+        top1 += fast[:1] == full[:1]
+        topk += fast == full
+
+    timings.sort()
+    return {
+        "universe": len(index),
+        "build_ms": round(build_ms, 1),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+        "exhaustive_p50_ms": round(statistics.median(full_timings), 2),
+        "target_ms": TICKER_SEARCH_LATENCY_TARGET_MS,
+        "top1_parity": round(top1 / len(probes), 3),
+        "topk_parity": round(topk / len(probes), 3),
+    }
+
+
+# allow direct execution for benchmarking: python -m stockbot.services.ngram_index [universe]
+if __name__ == '__main__':
+    report = benchmark(*(int(arg) for arg in sys.argv[1:2]))
+    print(report)
+    if report["topk_parity"] < 1:
+        print(f"⚠️ top-5 differs from exhaustive scoring for {1 - report['topk_parity']:.1%} of queries")
+    if report["p95_ms"] > TICKER_SEARCH_LATENCY_TARGET_MS:
+        print(f"⚠️ p95 {report['p95_ms']}ms is over the {TICKER_SEARCH_LATENCY_TARGET_MS}ms target")
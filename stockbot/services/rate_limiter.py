@@ -1,17 +1,174 @@
+import logging
+import threading
 import time
-from collections import deque
-from stockbot.config import RATE_LIMIT_WINDOW, RATE_LIMIT_MAX_CALLS
-
-USER_CALL_LOGS = {}  # user_id -> deque of timestamps
-
-def is_rate_limited(user_id):
-    """Returns True if user exceeded RATE_LIMIT_MAX_CALLS in the last RATE_LIMIT_WINDOW seconds."""
-    now = time.time()
-    dq = USER_CALL_LOGS.setdefault(user_id, deque())
-    # prune old timestamps
-    while dq and dq[0] <= now - RATE_LIMIT_WINDOW:
-        dq.popleft()
-    if len(dq) >= RATE_LIMIT_MAX_CALLS:
-        return True
-    dq.append(now)
-    return False
+from typing import NamedTuple, Optional, Tuple
+from cachetools import TTLCache
+from stockbot.config import (
+    RATE_LIMIT_WINDOW,
+    RATE_LIMIT_MAX_CALLS,
+    RATE_LIMIT_PREMIUM_MAX_CALLS,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_BACKEND,
+    TWELVEDATA_CREDITS_PER_MINUTE,
+)
+from stockbot.database.connection import db_connection
+from stockbot.database.queries import (
+    RATE_LIMIT_BUCKETS_CREATE,
+    RATE_LIMIT_TAKE,
+    RATE_LIMIT_PURGE_IDLE,
+)
+
+
+class Limit(NamedTuple):
+    capacity: int     # burst size: calls allowed back to back
+    per_seconds: float  # time for an empty bucket to refill completely
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+# (feature, tier) -> Limit; tier None is the fallback for any tier, and
+# feature "default" the fallback for any feature
+RATE_LIMITS = {
+    ("default", None): Limit(RATE_LIMIT_MAX_CALLS, RATE_LIMIT_WINDOW),
+    ("summary", None): Limit(RATE_LIMIT_MAX_CALLS, RATE_LIMIT_WINDOW),
+    ("summary", "premium"): Limit(RATE_LIMIT_PREMIUM_MAX_CALLS, RATE_LIMIT_WINDOW),
+}
+
+# The plan's TwelveData credits, shared by every process that spends them
+TWELVEDATA_CREDITS = Limit(TWELVEDATA_CREDITS_PER_MINUTE, 60)
+
+# A bucket left alone for its refill time is full again, so forgetting it
+# after the longest refill time loses nothing.
+_IDLE_SECONDS = max(limit.per_seconds for limit in (*RATE_LIMITS.values(), TWELVEDATA_CREDITS))
+
+RATE_LIMIT_STATS = {"allowed": 0, "limited": 0, "errors": 0}
+_STATS_LOCK = threading.Lock()
+
+
+class MemoryBackend:
+    """Buckets in this process only: (tokens, updated_at) per bucket in a bounded TTLCache."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, idle_seconds: float = _IDLE_SECONDS):
+        self._buckets = TTLCache(maxsize=max_keys, ttl=idle_seconds)
+        self._lock = threading.Lock()
+
+    def take(self, bucket: str, limit: Limit, cost: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(bucket, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[bucket] = (tokens, now)
+        return allowed, tokens
+
+    def purge_idle(self) -> int:
+        with self._lock:
+            before = len(self._buckets)
+            self._buckets.expire()
+            return before - len(self._buckets)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+
+class PostgresBackend:
+    """
+    Buckets in the UNLOGGED rate_limit_buckets table, so every bot and ETL
+    process shares the same limits. Each take() is one atomic upsert.
+    Fails open (allows the call) if the database can't be reached.
+    """
+
+    def __init__(self, partition: str = "interactive", idle_seconds: float = _IDLE_SECONDS):
+        self.partition = partition
+        self.idle_seconds = idle_seconds
+        self._ready = False
+
+    def _execute(self, sql, params):
+        with db_connection(self.partition) as conn, conn.cursor() as cur:
+            if not self._ready:
+                cur.execute(RATE_LIMIT_BUCKETS_CREATE)
+                self._ready = True
+            cur.execute(sql, params)
+            return cur.fetchone() if cur.description else cur.rowcount
+
+    def take(self, bucket: str, limit: Limit, cost: float) -> Tuple[bool, float]:
+        tokens, allowed = self._execute(RATE_LIMIT_TAKE, {
+            "bucket": bucket,
+            "capacity": float(limit.capacity),
+            "rate": limit.refill_rate,
+            "cost": float(cost),
+        })
+        return allowed, tokens
+
+    def purge_idle(self) -> int:
+        return self._execute(RATE_LIMIT_PURGE_IDLE, (self.idle_seconds,))
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+BACKENDS = {"memory": MemoryBackend, "postgres": PostgresBackend}
+
+
+def make_backend(name: str = RATE_LIMIT_BACKEND, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+BACKEND = make_backend()
+
+
+def get_limit(feature: str, tier: Optional[str] = None) -> Limit:
+    for key in ((feature, tier), (feature, None), ("default", tier), ("default", None)):
+        if key in RATE_LIMITS:
+            return RATE_LIMITS[key]
+
+
+def take(feature: str, key, limit: Limit, cost: float = 1.0, backend=None) -> Tuple[bool, float]:
+    """
+    Take `cost` tokens from the (feature, key) bucket.
+    Returns (allowed, seconds until `cost` tokens are available).
+    """
+    backend = backend or BACKEND
+    try:
+        allowed, tokens = backend.take(f"{feature}:{key}", limit, cost)
+    except Exception as e:
+        logging.warning(f"Rate limit backend failed for {feature}:{key}, allowing: {e}")
+        with _STATS_LOCK:
+            RATE_LIMIT_STATS["errors"] += 1
+        return True, 0.0
+    with _STATS_LOCK:
+        RATE_LIMIT_STATS["allowed" if allowed else "limited"] += 1
+    wait = 0.0 if allowed else max(0.0, (cost - tokens) / limit.refill_rate)
+    return allowed, wait
+
+
+def try_acquire(feature: str, key, limit: Limit, cost: float = 1.0, backend=None) -> bool:
+    """Take `cost` tokens from the (feature, key) bucket; False if it can't pay."""
+    return take(feature, key, limit, cost, backend)[0]
+
+
+def is_rate_limited(user_id, feature: str = "default", tier: Optional[str] = None) -> bool:
+    """Returns True if user_id has no tokens left for this feature at its tier's limit."""
+    return not try_acquire(feature, user_id, get_limit(feature, tier))
+
+
+def purge_idle_buckets() -> int:
+    """Drop buckets that have refilled completely; scheduled from main."""
+    try:
+        return BACKEND.purge_idle()
+    except Exception as e:
+        logging.warning(f"purge_idle_buckets failed: {e}")
+        return 0
+
+
+def rate_limiter_stats() -> dict:
+    with _STATS_LOCK:
+        stats = dict(RATE_LIMIT_STATS)
+    return {**stats, "size": BACKEND.size()}
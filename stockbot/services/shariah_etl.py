@@ -4,7 +4,7 @@ import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 from psycopg2.extras import execute_values
-from stockbot.database.connection import get_db_conn, put_db_conn
+from stockbot.database.connection import db_connection
 
 
 def scrape_shariah_data():
@@ -44,8 +44,6 @@ def update_shariah_table():
     Returns the number of rows processed.
     """
     df = scrape_shariah_data()
-    conn = get_db_conn()
-    cur = conn.cursor()
 
     # Convert DataFrame rows to plain Python tuples to avoid numpy types
     values = [
@@ -74,8 +72,7 @@ def update_shariah_table():
             al_bilad = EXCLUDED.al_bilad;
     """
 
-    execute_values(cur, query, values)
-    conn.commit()
-    cur.close()
-    put_db_conn(conn)
+    with db_connection("batch") as conn, conn.cursor() as cur:
+        execute_values(cur, query, values)
+        conn.commit()
     return len(values)
@@ -7,7 +7,7 @@ import yfinance as yf
 from psycopg2.extras import execute_values
 
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.data import COMPANIES
+from stockbot.data import get_companies
 
 # ─────────── Assess Dividend Continuity ───────────
 def assess_dividend_continuity(hist_dividends):
@@ -116,7 +116,7 @@ def fetch_symbol_info(symbol):
 
 # ─────────── Insert/Upsert stock info into PostgreSQL ───────────
 def insert_stock_info(rows):
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     sql = """
     INSERT INTO stock_data (
         symbol, exchange, industry, sector, "currentPrice",
@@ -222,6 +222,6 @@ def etl_stock_info(symbols):
 
 # ─────────── Manual refresh wrapper ───────────
 def refresh_stockinfo_test():
-    count = etl_stock_info(COMPANIES)
+    count = etl_stock_info(get_companies())
     logging.info(f"Processed {count} stock_info records.")
     return count
@@ -0,0 +1,72 @@
+# stockbot/services/subscriber_cache.py
+import threading
+from datetime import date
+from typing import NamedTuple, Optional
+from cachetools import TTLCache
+from stockbot.config import SUBSCRIBER_CACHE_SIZE, SUBSCRIBER_CACHE_TTL
+
+
+class SubscriberState(NamedTuple):
+    # subscription_type is None for a chat that has no subscribers row yet
+    subscription_type: Optional[str]
+    expires_at: Optional[date]
+    usage_limit: Optional[int]
+
+    def is_expired(self, today: date) -> bool:
+        return (
+            self.subscription_type == "premium"
+            and self.expires_at is not None
+            and self.expires_at < today
+        )
+
+    @property
+    def effective_tier(self) -> Optional[str]:
+        """
+        The tier to act on today: a premium row past its expiry counts as free
+        even before the expiry sweep has rewritten it.
+        """
+        return "free" if self.is_expired(date.today()) else self.subscription_type
+
+
+UNREGISTERED = SubscriberState(None, None, None)
+
+_CACHE = TTLCache(maxsize=SUBSCRIBER_CACHE_SIZE, ttl=SUBSCRIBER_CACHE_TTL)
+_LOCK = threading.Lock()
+SUBSCRIBER_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def get_state(chat_id: int) -> Optional[SubscriberState]:
+    with _LOCK:
+        state = _CACHE.get(chat_id)
+        SUBSCRIBER_CACHE_STATS["hits" if state is not None else "misses"] += 1
+    return state
+
+
+def peek_state(chat_id: int) -> Optional[SubscriberState]:
+    """Like get_state, without counting towards the hit ratio."""
+    with _LOCK:
+        return _CACHE.get(chat_id)
+
+
+def put_state(chat_id: int, state: SubscriberState) -> None:
+    with _LOCK:
+        _CACHE[chat_id] = state
+
+
+def invalidate(chat_id: int) -> None:
+    """Drop a chat's cached state after its subscription row was written."""
+    with _LOCK:
+        _CACHE.pop(chat_id, None)
+
+
+def subscriber_cache_stats() -> dict:
+    with _LOCK:
+        hits, misses = SUBSCRIBER_CACHE_STATS["hits"], SUBSCRIBER_CACHE_STATS["misses"]
+        size = len(_CACHE)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+        "size": size,
+    }
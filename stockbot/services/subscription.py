@@ -1,14 +1,17 @@
 import logging
 from datetime import date
 from stockbot.database.connection import get_db_conn, put_db_conn
-from stockbot.database.queries import SUBSCRIBER_CONSUME_FREE_CREDIT, SUBSCRIBER_SELECT_USAGE
-from stockbot.database.queries import SUBSCRIBER_RESET_DAILY_USAGE
+from stockbot.database.prepared import execute_prepared
+from stockbot.database.queries import SUBSCRIBER_CONSUME_FREE_CREDIT, SUBSCRIBER_CHECK_AND_CONSUME
+from stockbot.database.queries import SUBSCRIBER_RESET_DAILY_USAGE, SUBSCRIBER_DOWNGRADE_EXPIRED
+from stockbot.services import subscriber_cache
+from stockbot.services.subscriber_cache import SubscriberState
 
 def consume_free_credit(chat_id: int) -> bool:
     conn = get_db_conn()
     try:
         with conn.cursor() as cur:
-            cur.execute(SUBSCRIBER_CONSUME_FREE_CREDIT, (chat_id,))
+            execute_prepared(cur, SUBSCRIBER_CONSUME_FREE_CREDIT, (chat_id,))
             row = cur.fetchone()
             if not row:
                 return False
@@ -17,22 +20,38 @@ def consume_free_credit(chat_id: int) -> bool:
     finally:
         put_db_conn(conn)
 
-def check_usage_quota_for_query(query, chat_id) -> bool:
+def check_and_consume_quota(chat_id: int):
+    """
+    Downgrade-if-expired, tier lookup and free-credit consumption in one
+    statement. Returns (subscription_type, allowed), or (None, True) for an
+    unregistered chat.
+    """
     conn = get_db_conn()
     try:
         with conn.cursor() as cur:
-            cur.execute(SUBSCRIBER_SELECT_USAGE, (chat_id,))
+            execute_prepared(cur, SUBSCRIBER_CHECK_AND_CONSUME, (date.today(), chat_id))
             row = cur.fetchone()
+            conn.commit()
     finally:
         put_db_conn(conn)
 
-    if row and row[0] == 'free':
-        if not consume_free_credit(chat_id):
-            query.answer(
-                "شكرا لك على استخدامك بوت نمو+! نود اشعارك بإنتهاء الحد اليومي للإستخدام .",
-                show_alert=True
-            )
-            return False
+    if not row:
+        return None, True
+    tier, allowed = row
+    cached = subscriber_cache.peek_state(chat_id)
+    if cached is not None and cached.subscription_type != tier:
+        # the statement downgraded an expired premium row
+        subscriber_cache.invalidate(chat_id)
+    return tier, allowed
+
+def check_usage_quota_for_query(query, chat_id) -> bool:
+    _, allowed = check_and_consume_quota(chat_id)
+    if not allowed:
+        query.answer(
+            "شكرا لك على استخدامك بوت نمو+! نود اشعارك بإنتهاء الحد اليومي للإستخدام .",
+            show_alert=True
+        )
+        return False
     return True
 
 def reset_daily_usage():
@@ -40,7 +59,7 @@ def reset_daily_usage():
     Reset free users' daily usage_count to zero.
     Should be called once per day (00:00 Asia/Riyadh).
     """
-    conn = get_db_conn()
+    conn = get_db_conn("batch")
     try:
         with conn.cursor() as cur:
             cur.execute(SUBSCRIBER_RESET_DAILY_USAGE, (date.today(),))
@@ -49,4 +68,29 @@ def reset_daily_usage():
     except Exception as e:
         logging.error(f"reset_daily_usage failed: {e}", exc_info=True)
     finally:
-        put_db_conn(conn)
\ No newline at end of file
+        put_db_conn(conn)
+
+
+def downgrade_expired_subscribers():
+    """
+    Flip every premium subscriber whose expires_at has passed back to free
+    in one statement, and refresh their cached state.
+    Scheduled hourly so request handlers never have to write on expiry.
+    """
+    conn = get_db_conn("batch")
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SUBSCRIBER_DOWNGRADE_EXPIRED, (date.today(),))
+            rows = cur.fetchall()
+            conn.commit()
+    except Exception as e:
+        logging.error(f"downgrade_expired_subscribers failed: {e}", exc_info=True)
+        return 0
+    finally:
+        put_db_conn(conn)
+
+    for chat_id, *state in rows:
+        subscriber_cache.put_state(chat_id, SubscriberState(*state))
+    if rows:
+        logging.info(f"⏳ downgrade_expired_subscribers: {len(rows)} premium subscriptions expired")
+    return len(rows)
@@ -0,0 +1,87 @@
+# stockbot/services/symbol_registry.py
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
+
+
+class SymbolInfo(NamedTuple):
+    symbol: str
+    arabic_name: Optional[str]
+    english_name: Optional[str]
+    is_saudi: bool
+
+
+class Universe(NamedTuple):
+    """
+    Everything derived from one read of tickers_ar_en. Built in full by
+    ticker_service.load_ticker_names and published with a single assignment,
+    so the search index, the registry and the company list a reader sees
+    always come from the same read.
+    """
+    rows: tuple                       # (symbol, arabic_name, english_name)
+    registry: Mapping                 # symbol -> SymbolInfo, read-only
+    companies: tuple                  # sorted symbols
+    search_index: object              # ticker_service.SearchIndex
+    fingerprint: int
+
+
+# The current Universe, or None before the first load. Never mutated in place:
+# publish() rebinds the name, and readers take one reference and use only it.
+_UNIVERSE = None
+_EMPTY = MappingProxyType({})
+
+
+def _is_saudi(symbol: str) -> bool:
+    return symbol.upper().endswith(".SR")
+
+
+def build_registry(rows) -> Mapping:
+    """Read-only symbol -> SymbolInfo mapping from (symbol, arabic_name, english_name) rows."""
+    return MappingProxyType({
+        row[0]: SymbolInfo(row[0], row[1], row[2], _is_saudi(row[0]))
+        for row in rows
+    })
+
+
+def publish(universe: Universe) -> None:
+    global _UNIVERSE
+    _UNIVERSE = universe
+
+
+def current() -> Optional[Universe]:
+    return _UNIVERSE
+
+
+def _registry() -> Mapping:
+    universe = _UNIVERSE
+    return universe.registry if universe is not None else _EMPTY
+
+
+def is_loaded() -> bool:
+    return _UNIVERSE is not None
+
+
+def get_symbol(symbol: str) -> Optional[SymbolInfo]:
+    return _registry().get(symbol)
+
+
+def symbol_exists(symbol: str) -> bool:
+    return symbol in _registry()
+
+
+def get_arabic_name(symbol: str) -> Optional[str]:
+    info = _registry().get(symbol)
+    return info.arabic_name if info else None
+
+
+def get_english_name(symbol: str) -> Optional[str]:
+    info = _registry().get(symbol)
+    return info.english_name if info else None
+
+
+def is_saudi_symbol(symbol: str) -> bool:
+    info = _registry().get(symbol)
+    return info.is_saudi if info else _is_saudi(symbol)
+
+
+def all_symbols() -> list:
+    return sorted(_registry())
@@ -1,46 +1,165 @@
 # stockbot/services/ticker_service.py
+import logging
 import re
+import threading
+import time
+from typing import NamedTuple
+from cachetools import LRUCache
 from rapidfuzz import process, fuzz
+from stockbot.config import (
+    TICKER_SEARCH_PARITY,
+    TICKER_SEARCH_LATENCY_TARGET_MS,
+    TICKER_SEARCH_CACHE_SIZE,
+    TICKER_LOAD_WAIT_SECONDS,
+)
 from stockbot.database.connection import get_db_conn, put_db_conn
+from stockbot.database.queries import TICKERS_SELECT
+from stockbot.services import symbol_registry
+from stockbot.services.ngram_index import NgramIndex
+
+# Compiled once; the normalizers run on every row at load time and on every query.
+_AR_DIACRITICS_RE = re.compile(r"[\u0617-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_ARABIC_CHAR_RE = re.compile(r'[\u0600-\u06FF]')
+_SAUDI_SYMBOL_RE = re.compile(r"(\d{4})(\.SR)?")
+
+# (normalized query, max_results, min_score) -> matches, for the current index.
+# Emptied whenever load_ticker_names publishes a new index.
+_SEARCH_CACHE = LRUCache(maxsize=TICKER_SEARCH_CACHE_SIZE)
+_SEARCH_CACHE_LOCK = threading.Lock()
+SEARCH_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+class SearchIndex(NamedTuple):
+    """Pre-normalized choices, n-gram prefilters and row lookups used by find_top_matches."""
+    ar_ngrams: NgramIndex
+    ar_rows: dict
+    en_ngrams: NgramIndex
+    en_rows: dict
 
-TICKER_DATA = []
-AR_NAMES = []
-EN_NAMES = []
 
 def _normalize_ar(txt: str) -> str:
-    pat = re.compile(r"[\u0617-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
-    txt = pat.sub("", txt)
+    txt = _AR_DIACRITICS_RE.sub("", txt)
     txt = txt.replace("ـ", "")
     txt = txt.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
-    txt = re.sub(r"\s+", " ", txt).strip()
+    txt = _WHITESPACE_RE.sub(" ", txt).strip()
     return txt
 
 def _normalize_en(txt: str) -> str:
-    return re.sub(r"\s+", " ", txt.lower().strip())
+    return _WHITESPACE_RE.sub(" ", txt.lower().strip())
 
 def _detect_lang(txt: str) -> str:
-    return 'arabic' if re.search(r'[\u0600-\u06FF]', txt) else 'english'
+    return 'arabic' if _ARABIC_CHAR_RE.search(txt) else 'english'
 
-def load_ticker_names():
-    global TICKER_DATA, AR_NAMES, EN_NAMES
-    conn = get_db_conn()
-    with conn.cursor() as cur:
-        cur.execute("SELECT symbol, arabic_name, english_name FROM tickers_ar_en;")
-        TICKER_DATA = cur.fetchall()
-    put_db_conn(conn)
+def build_search_index(rows) -> SearchIndex:
+    """Normalize every (symbol, arabic_name, english_name) row once."""
+    ar_rows = {_normalize_ar(row[1]): row for row in rows if row[1]}
+    en_rows = {_normalize_en(row[2]): row for row in rows if row[2]}
+    return SearchIndex(
+        ar_ngrams=NgramIndex(ar_rows),
+        ar_rows=ar_rows,
+        en_ngrams=NgramIndex(en_rows),
+        en_rows=en_rows,
+    )
+
+_EMPTY_INDEX = build_search_index([])
+_RELOAD_LOCK = threading.Lock()
+_UNIVERSE_READY = threading.Event()
+_LOADER_THREAD = None
+_LOADER_LOCK = threading.Lock()
+
+def _search_index() -> SearchIndex:
+    universe = symbol_registry.current()
+    return universe.search_index if universe is not None else _EMPTY_INDEX
+
+def load_ticker_names(force: bool = True) -> bool:
+    """
+    Load tickers_ar_en and publish one symbol_registry.Universe (search index,
+    symbol registry, company list) built from that read.
+    Returns False when `force` is off and the table has not changed.
+    """
+    conn = get_db_conn("batch")
+    try:
+        with conn.cursor() as cur:
+            cur.execute(TICKERS_SELECT)
+            rows = [tuple(row) for row in cur.fetchall()]
+    finally:
+        put_db_conn(conn)
+
+    with _RELOAD_LOCK:
+        fingerprint = hash(tuple(rows))
+        previous = symbol_registry.current()
+        if not force and previous is not None and fingerprint == previous.fingerprint:
+            return False
+
+        # Build every piece first, then publish them together in one assignment.
+        universe = symbol_registry.Universe(
+            rows=tuple(rows),
+            registry=symbol_registry.build_registry(rows),
+            companies=tuple(sorted(row[0] for row in rows)),
+            search_index=build_search_index(rows),
+            fingerprint=fingerprint,
+        )
+        with _SEARCH_CACHE_LOCK:
+            symbol_registry.publish(universe)
+            _SEARCH_CACHE.clear()
+    _UNIVERSE_READY.set()
+    return True
+
+def load_ticker_names_async():
+    """
+    Start the first universe load in the background so startup doesn't wait
+    on the DB. A no-op while a load is already running.
+    """
+    global _LOADER_THREAD
+
+    def _run():
+        try:
+            load_ticker_names()
+            logging.info(f"ticker universe loaded: {len(symbol_registry.current().rows)} symbols")
+        except Exception as e:
+            logging.error(f"initial ticker load failed: {e}", exc_info=True)
+
+    with _LOADER_LOCK:
+        if _LOADER_THREAD is not None and _LOADER_THREAD.is_alive():
+            return
+        _LOADER_THREAD = threading.Thread(target=_run, name="ticker-universe-loader", daemon=True)
+        _LOADER_THREAD.start()
 
-    AR_NAMES = [row[1] for row in TICKER_DATA if row[1]]
-    EN_NAMES = [row[2] for row in TICKER_DATA if row[2]]
+def ensure_ticker_names(timeout: float = TICKER_LOAD_WAIT_SECONDS) -> bool:
+    """
+    Wait up to `timeout` for a universe to be published. If the background
+    load died, start it again rather than loading on the caller's thread.
+    Returns False if the universe still isn't ready.
+    """
+    if _UNIVERSE_READY.is_set():
+        return True
+    load_ticker_names_async()
+    return _UNIVERSE_READY.wait(timeout)
+
+def reload_ticker_universe():
+    """
+    Scheduler entry point: pick up new or renamed listings without a restart.
+    Runs off the message path; the old snapshot stays live until the new one is ready.
+    """
+    try:
+        if load_ticker_names(force=False):
+            logging.info(f"🔄 ticker universe reloaded: {len(symbol_registry.current().rows)} symbols")
+    except Exception as e:
+        logging.error(f"reload_ticker_universe failed: {e}", exc_info=True)
 
 def parse_symbol(raw: str):
     s = raw.strip().upper()
-    m = re.fullmatch(r'(\d{4})(\.SR)?', s)
+    m = _SAUDI_SYMBOL_RE.fullmatch(s)
     if m:
         base = m.group(1)
         return f"{base}.SR", base, True
     return s, s, False
 
 def symbol_exists_in_db(sym: str) -> bool:
+    # Served from the in-memory registry; the DB is only hit before the first load.
+    if symbol_registry.is_loaded():
+        return symbol_registry.symbol_exists(sym)
     conn = get_db_conn()
     try:
         with conn.cursor() as cur:
@@ -49,21 +168,23 @@ def symbol_exists_in_db(sym: str) -> bool:
     finally:
         put_db_conn(conn)
 
-def find_top_matches(query: str, max_results: int = 5, min_score: int = 60):
-    lang = _detect_lang(query)
-    q_norm = _normalize_ar(query) if lang == 'arabic' else _normalize_en(query)
-
-    norm_ar = {_normalize_ar(row[1]): row for row in TICKER_DATA if row[1]}
-    norm_en = {_normalize_en(row[2]): row for row in TICKER_DATA if row[2]}
-
-    ar_matches = process.extract(q_norm, list(norm_ar.keys()), scorer=fuzz.WRatio, limit=max_results)
-    en_matches = process.extract(q_norm, list(norm_en.keys()), scorer=fuzz.WRatio, limit=max_results)
+def _score_matches(index: SearchIndex, q_norm: str, max_results: int, min_score: int,
+                   exhaustive: bool = False):
+    if exhaustive:
+        ar_matches = process.extract(q_norm, index.ar_ngrams.choices, scorer=fuzz.WRatio,
+                                     limit=max_results, score_cutoff=min_score)
+        en_matches = process.extract(q_norm, index.en_ngrams.choices, scorer=fuzz.WRatio,
+                                     limit=max_results, score_cutoff=min_score)
+    else:
+        # same top-k as the exhaustive scan, scoring only names that can still make it
+        ar_matches = index.ar_ngrams.extract(q_norm, max_results, min_score)
+        en_matches = index.en_ngrams.extract(q_norm, max_results, min_score)
 
     results = []
     for txt, score, _ in ar_matches + en_matches:
         if score < min_score:
             continue
-        row = norm_ar.get(txt) or norm_en.get(txt)
+        row = index.ar_rows.get(txt) or index.en_rows.get(txt)
         results.append((row[0], row[1] or row[2], score))
 
     seen, final = set(), []
@@ -75,5 +196,48 @@ def find_top_matches(query: str, max_results: int = 5, min_score: int = 60):
             break
     return final
 
-# Load ticker names on module import
-load_ticker_names()
+def search_cache_stats() -> dict:
+    with _SEARCH_CACHE_LOCK:
+        hits, misses = SEARCH_CACHE_STATS["hits"], SEARCH_CACHE_STATS["misses"]
+        size = len(_SEARCH_CACHE)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+        "size": size,
+    }
+
+def find_top_matches(query: str, max_results: int = 5, min_score: int = 60):
+    """Best (symbol, name, score) matches, or None while the universe is still loading."""
+    if not ensure_ticker_names():
+        return None
+    lang = _detect_lang(query)
+    q_norm = _normalize_ar(query) if lang == 'arabic' else _normalize_en(query)
+    key = (q_norm, max_results, min_score)
+
+    with _SEARCH_CACHE_LOCK:
+        index = _search_index()
+        cached = _SEARCH_CACHE.get(key)
+        SEARCH_CACHE_STATS["hits" if cached is not None else "misses"] += 1
+    if cached is not None:
+        return list(cached)
+
+    started = time.perf_counter()
+    final = _score_matches(index, q_norm, max_results, min_score)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms > TICKER_SEARCH_LATENCY_TARGET_MS:
+        logging.warning(f"ticker search for {q_norm!r} took {elapsed_ms:.1f}ms "
+                        f"(target {TICKER_SEARCH_LATENCY_TARGET_MS}ms)")
+
+    if TICKER_SEARCH_PARITY:
+        expected = _score_matches(index, q_norm, max_results, min_score, exhaustive=True)
+        if [(s, sc) for s, _, sc in final] != [(s, sc) for s, _, sc in expected]:
+            logging.warning(f"ticker search parity mismatch for {q_norm!r}: "
+                            f"prefilter={final} exhaustive={expected}")
+
+    with _SEARCH_CACHE_LOCK:
+        # skip the store if the index was swapped while we were scoring
+        if index is _search_index():
+            _SEARCH_CACHE[key] = tuple(final)
+    return final
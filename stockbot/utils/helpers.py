@@ -1,32 +1,89 @@
 # stockbot/utils/helpers.py
 import logging
+import threading
+from cachetools import TTLCache
 from stockbot.database.connection import get_db_conn, put_db_conn
+from stockbot.services import symbol_registry
 
-def get_arabic_name_from_db(symbol: str) -> str:
-    """
-    Returns Arabic name for a symbol if found in tickers_ar_en.
-    Automatically handles .SR suffix for Saudi stocks.
-    """
-    conn = get_db_conn()
+_MISSING = object()
 
+# Symbols that are not (yet) in the registry snapshot: symbol -> arabic name,
+# or None for a confirmed miss, so unknown symbols don't query the DB per click.
+_ARABIC_NAME_FALLBACK = TTLCache(maxsize=5_000, ttl=900)
+_ARABIC_NAME_LOCK = threading.Lock()
+
+
+def _normalize_symbol(symbol: str) -> str:
     # Normalize: add ".SR" if it looks like a Saudi stock (4-digit code)
     if symbol.isdigit() and len(symbol) == 4:
-        symbol = f"{symbol}.SR"
+        return f"{symbol}.SR"
+    return symbol
+
 
+def _lookup_cached(symbol: str):
+    """Return the memoized Arabic name (possibly None) or _MISSING."""
+    info = symbol_registry.get_symbol(symbol)
+    if info is not None:
+        return info.arabic_name
+    with _ARABIC_NAME_LOCK:
+        return _ARABIC_NAME_FALLBACK.get(symbol, _MISSING)
+
+
+def _fetch_arabic_names(symbols) -> dict:
+    """Query tickers_ar_en for the given symbols and memoize hits and misses."""
+    found = {}
+    conn = get_db_conn()
     try:
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT arabic_name
+                SELECT symbol, arabic_name
                 FROM tickers_ar_en
-                WHERE symbol = %s
-                LIMIT 1
-            """, (symbol,))
-            row = cur.fetchone()
-            if row:
-                return row[0]
+                WHERE symbol = ANY(%s)
+            """, (list(symbols),))
+            found = dict(cur.fetchall())
     except Exception as e:
-        logging.warning(f"Arabic name lookup failed for {symbol}: {e}")
+        logging.warning(f"Arabic name lookup failed for {symbols}: {e}")
+        return {}
     finally:
         put_db_conn(conn)
 
-    return None
\ No newline at end of file
+    with _ARABIC_NAME_LOCK:
+        for sym in symbols:
+            _ARABIC_NAME_FALLBACK[sym] = found.get(sym)
+    return found
+
+
+def get_arabic_name_from_db(symbol: str) -> str:
+    """
+    Returns Arabic name for a symbol if found in tickers_ar_en.
+    Automatically handles .SR suffix for Saudi stocks.
+    Served from the symbol registry; only unknown symbols reach the DB.
+    """
+    symbol = _normalize_symbol(symbol)
+    name = _lookup_cached(symbol)
+    if name is _MISSING:
+        name = _fetch_arabic_names([symbol]).get(symbol)
+    return name
+
+
+def get_arabic_names_from_db(symbols) -> dict:
+    """
+    Bulk variant of get_arabic_name_from_db: returns {symbol: arabic_name or None}
+    keyed by the symbols as given. Known symbols come from the symbol registry;
+    the unknown ones share at most one query.
+    """
+    result, unknown = {}, {}
+    for symbol in symbols:
+        normalized = _normalize_symbol(symbol)
+        name = _lookup_cached(normalized)
+        if name is _MISSING:
+            unknown.setdefault(normalized, []).append(symbol)
+        else:
+            result[symbol] = name
+
+    if unknown:
+        fetched = _fetch_arabic_names(unknown)
+        for normalized, originals in unknown.items():
+            for symbol in originals:
+                result[symbol] = fetched.get(normalized)
+    return result
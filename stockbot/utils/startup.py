@@ -0,0 +1,54 @@
+# stockbot/utils/startup.py
+import importlib
+import sys
+import time
+
+# Libraries that dominate cold-start time; none of them should be imported
+# before polling starts when LAZY_STARTUP is on.
+HEAVY_MODULES = (
+    "pandas",
+    "plotly.graph_objects",
+    "matplotlib",
+    "yfinance",
+    "bs4",
+    "twelvedata",
+)
+
+
+def import_profile(modules=HEAVY_MODULES, load: bool = False) -> list:
+    """
+    Returns (module, status, ms) for each module:
+      - "preloaded" → already imported by the time this runs
+      - "imported"  → imported here (only when load=True), ms is its import time
+      - "deferred"  → not imported yet; will load on first use
+    """
+    report = []
+    for name in modules:
+        if name in sys.modules:
+            report.append((name, "preloaded", 0.0))
+        elif load:
+            started = time.perf_counter()
+            importlib.import_module(name)
+            report.append((name, "imported", (time.perf_counter() - started) * 1000))
+        else:
+            report.append((name, "deferred", 0.0))
+    return report
+
+
+def format_import_profile(report, total_ms: float = None) -> str:
+    lines = ["⏱️ startup import profile:"]
+    if total_ms is not None:
+        lines.append(f"  stockbot.main imports: {total_ms:.0f} ms")
+    for name, status, ms in report:
+        suffix = f" {ms:.0f} ms" if status == "imported" else ""
+        lines.append(f"  {name:<22} {status}{suffix}")
+    return "\n".join(lines)
+
+
+# allow direct execution: python -m stockbot.utils.startup
+if __name__ == '__main__':
+    started = time.perf_counter()
+    import stockbot.main  # noqa: F401
+    main_ms = (time.perf_counter() - started) * 1000
+    print(format_import_profile(import_profile(), main_ms))
+    print(format_import_profile(import_profile(load=True)))